@@ -1,23 +1,37 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import random
 import math
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.special import expit
 
-
-L = 25
+from .observables import Accumulator, ising_moments, thermodynamics
 
 
 class IsingLattice:
-    def __init__(self):
+    # E = -sum over bonds of s_i s_j - h sum_i s_i, in units of J.
+    def __init__(self, L=25, seed=None, h=0.0):
+        self.L = L
+        self.h = h
+        self.rng = np.random.default_rng(seed)
+        self._tables = {}
+        self._wolff_clusters = {}
         self.lattice = self.create_base_lattice()
+        self.recompute_totals()
+        self.sweeps = {
+            "metropolis": self.one_sweep,
+            "checkerboard": self.checkerboard_sweep,
+            "wolff": self.wolff_sweep,
+            "swendsen_wang": self.swendsen_wang_sweep,
+        }
 
     def create_base_lattice(self):
-        a = np.random.randint(0, 2, (L, L))
+        a = self.rng.integers(0, 2, (self.L, self.L))
         a = (a*2) - 1
         return a
 
     def find_neighbours(self, position):
         i, j = position
+        L = self.L
         north = (i, (j-1) % L)
         south = (i, (j+1) % L)
         west = ((i-1) % L, j)
@@ -25,7 +39,7 @@ class IsingLattice:
         return north, east, south, west
 
     def random_pos(self):
-        pos = (random.randint(0, L-1), random.randint(0, L-1))
+        pos = tuple(self.rng.integers(0, self.L, 2))
         return pos
 
     def compute_energy_change(self, pos):
@@ -33,10 +47,14 @@ class IsingLattice:
         neigbour_values_sum = 0
         for coord in neigbour_locations:
             neigbour_values_sum += self.lattice[coord]
-        deltaE = 2*self.lattice[pos]*neigbour_values_sum
+        deltaE = 2*self.lattice[pos]*(neigbour_values_sum + self.h)
         return deltaE
 
-    def flip_spin(self, pos):
+    def flip_spin(self, pos, energy_change=None):
+        if energy_change is None:
+            energy_change = self.compute_energy_change(pos)
+        self.energy += energy_change
+        self.magnetisation -= 2*self.lattice[pos]
         self.lattice[pos] = self.lattice[pos]*-1
 
     def find_boltzman_prob(self, energy_change, temp):
@@ -44,33 +62,191 @@ class IsingLattice:
         P = math.exp(power)
         return P
 
+    # self.energy and self.magnetisation are running totals, updated by
+    # every flip, so measuring is O(1). Anything that writes to
+    # self.lattice directly must call recompute_totals afterwards.
     def measure_magnetisation(self):
-        total_magnetisation = (np.sum(self.lattice))
-        return abs(total_magnetisation)
+        return abs(self.magnetisation)
 
     def measure_energy(self):
-        energy = 0
-        for i in range(L):
-            for j in range(L):
-                spin_state = self.lattice[i, j]
-                all_neighbours = self.find_neighbours((i, j))
-                right = self.lattice[all_neighbours[1]]
-                down = self.lattice[all_neighbours[2]]
-                neigbours_sum = right + down
-                energy += -spin_state * neigbours_sum
+        return self.energy
+
+    def compute_magnetisation(self):
+        return int(np.sum(self.lattice))
+
+    def compute_energy(self):
+        a = self.lattice
+        energy = -int(np.sum(a * (np.roll(a, -1, axis=0) + np.roll(a, -1, axis=1))))
+        if self.h:
+            energy -= self.h * self.compute_magnetisation()
         return energy
 
+    def recompute_totals(self):
+        self.energy = self.compute_energy()
+        self.magnetisation = self.compute_magnetisation()
+
+    def acceptance_table(self, T):
+        # Metropolis acceptance min(1, exp(-dE/T)) for every spin s and
+        # neighbour sum n, at index [(s + 1) // 2, (n + 4) // 2]. The energy
+        # change only takes these ten values, so no flip needs an exp. The
+        # table depends on the field too, so h can change between sweeps.
+        key = (T, self.h)
+        if key not in self._tables:
+            spin = np.array([-1, 1])[:, None]
+            neighbour_sum = np.arange(-4, 5, 2)[None, :]
+            energy_change = 2 * spin * (neighbour_sum + self.h)
+            self._tables[key] = np.minimum(1.0, np.exp(-energy_change / T))
+        return self._tables[key]
+
     def one_sweep(self, T):
-        for _ in range(L**2):
-            position = self.random_pos()
-            energy_change = self.compute_energy_change(position)
-            if energy_change < 0:
-                self.flip_spin(position)
-            else:
-                probability = self.find_boltzman_prob(energy_change, T)
-                rand_float = random.random()
-                if rand_float <= probability:
-                    self.flip_spin(position)
+        # L^2 random single-site updates. The sites and uniforms are drawn
+        # as one block per sweep, and the loop works on a plain list copy of
+        # the lattice, which is much faster to index than the array.
+        n = self.lattice.size
+        table = self.acceptance_table(T).tolist()
+        neighbours = self.neighbour_table().tolist()
+        spins = self.lattice.reshape(-1).tolist()
+        sites = self.rng.integers(0, n, n).tolist()
+        uniforms = self.rng.random(n).tolist()
+        flipped = 0
+        neighbour_total = 0
+        for site, u in zip(sites, uniforms):
+            spin = spins[site]
+            a, b, c, d = neighbours[site]
+            neighbour_sum = spins[a] + spins[b] + spins[c] + spins[d]
+            if u < table[(spin + 1) >> 1][(neighbour_sum + 4) >> 1]:
+                spins[site] = -spin
+                flipped += spin
+                neighbour_total += spin * neighbour_sum
+        self.lattice[:] = np.reshape(spins, self.lattice.shape)
+        # flipped and neighbour_total sum s and s n over the accepted flips.
+        self.energy += 2 * neighbour_total + 2 * self.h * flipped
+        self.magnetisation -= 2 * flipped
+
+    def neighbour_sum(self):
+        a = self.lattice
+        return (np.roll(a, 1, axis=0) + np.roll(a, -1, axis=0)
+                + np.roll(a, 1, axis=1) + np.roll(a, -1, axis=1))
+
+    def sublattices(self):
+        # Flat indices of the two colours of a checkerboard. No site has a
+        # neighbour of its own colour, so a whole colour can be updated at
+        # once.
+        if not hasattr(self, "_sublattices"):
+            i, j = np.indices((self.L, self.L))
+            colour = ((i + j) % 2).reshape(-1)
+            self._sublattices = (np.flatnonzero(colour == 0),
+                                 np.flatnonzero(colour == 1))
+        return self._sublattices
+
+    def checkerboard_sweep(self, T):
+        if self.L % 2:
+            raise ValueError("The checkerboard update needs an even lattice size.")
+        flat = self.lattice.reshape(-1)
+        for sites in self.sublattices():
+            spins = flat[sites]
+            neighbour_sum = self.neighbour_sum().reshape(-1)[sites]
+            probability = self.acceptance_table(T)[(spins + 1) // 2, (neighbour_sum + 4) // 2]
+            accept = self.rng.random(len(sites)) < probability
+            flat[sites] = np.where(accept, -spins, spins)
+            flipped = int(spins[accept].sum())
+            self.energy += 2 * int((spins * neighbour_sum)[accept].sum()) + 2 * self.h * flipped
+            self.magnetisation -= 2 * flipped
+
+    def neighbour_table(self):
+        # Flat indices of the north, east, south and west neighbours of
+        # every site, in the same order as find_neighbours.
+        if not hasattr(self, "_neighbour_table"):
+            L = self.L
+            i, j = np.indices((L, L))
+            self._neighbour_table = np.stack([
+                i * L + (j - 1) % L,
+                ((i + 1) % L) * L + j,
+                i * L + (j + 1) % L,
+                ((i - 1) % L) * L + j,
+            ], axis=-1).reshape(-1, 4)
+        return self._neighbour_table
+
+    def wolff_cluster(self, T, seed_site=None):
+        # Grow one cluster from a random site, a whole frontier at a time.
+        # Each bond from the frontier to an aligned spin outside the cluster
+        # is added with probability 1 - exp(-2/T), with its own random draw.
+        flat = self.lattice.reshape(-1)
+        neighbours = self.neighbour_table()
+        p_add = 1 - math.exp(-2 / T)
+        if seed_site is None:
+            seed_site = self.rng.integers(flat.size)
+        spin = flat[seed_site]
+        in_cluster = np.zeros(flat.size, dtype=bool)
+        in_cluster[seed_site] = True
+        frontier = np.array([seed_site])
+        while len(frontier):
+            candidates = neighbours[frontier].reshape(-1)
+            bonded = ((flat[candidates] == spin) & ~in_cluster[candidates]
+                      & (self.rng.random(len(candidates)) < p_add))
+            frontier = np.unique(candidates[bonded])
+            in_cluster[frontier] = True
+        cluster = np.flatnonzero(in_cluster)
+        # In a field the flip is accepted with probability
+        # min(1, exp(-2 h s |C| / T)), since the bonds are already balanced.
+        field_change = 2 * self.h * int(spin) * len(cluster)
+        if field_change > 0 and self.rng.random() >= math.exp(-field_change / T):
+            return cluster
+        # Only the bonds across the cluster boundary change energy.
+        boundary = neighbours[cluster]
+        outside = ~in_cluster[boundary]
+        self.energy += 2 * int(spin) * int(flat[boundary][outside].sum()) + field_change
+        self.magnetisation -= 2 * int(spin) * len(cluster)
+        flat[cluster] = -spin
+        return cluster
+
+    def wolff_sweep(self, T):
+        # A sweep grows enough clusters to visit about L^2 spins, so it does
+        # a comparable amount of work to the other methods. The number of
+        # clusters is fixed before the sweep from the mean cluster size so
+        # far: stopping a sweep on the number of spins it has visited makes
+        # the measurement times depend on the cluster sizes, which biases
+        # the averages on small lattices.
+        clusters, visited = self._wolff_clusters.get((T, self.h), (0, 0))
+        if clusters:
+            count = max(1, round(self.lattice.size * clusters / visited))
+            for _ in range(count):
+                visited += len(self.wolff_cluster(T))
+            clusters += count
+        else:
+            while visited < self.lattice.size:
+                visited += len(self.wolff_cluster(T))
+                clusters += 1
+        self._wolff_clusters[(T, self.h)] = (clusters, visited)
+
+    def swendsen_wang_sweep(self, T):
+        # Bond every aligned nearest-neighbour pair with probability
+        # 1 - exp(-2/T), label the clusters, and give each cluster a new
+        # spin from its heat bath in the field: up with probability
+        # expit(2 h |C| / T) = 1 / (1 + exp(-2 h |C| / T)), which is 1/2
+        # without a field and does not overflow in a strong one.
+        flat = self.lattice.reshape(-1)
+        n = flat.size
+        p_add = 1 - math.exp(-2 / T)
+        sites = np.arange(n)
+        first = []
+        second = []
+        for direction in (1, 2):
+            other = self.neighbour_table()[:, direction]
+            bonded = (flat == flat[other]) & (self.rng.random(n) < p_add)
+            first.append(sites[bonded])
+            second.append(other[bonded])
+        first = np.concatenate(first)
+        second = np.concatenate(second)
+        graph = coo_matrix((np.ones(len(first), dtype=np.int8), (first, second)),
+                           shape=(n, n))
+        n_clusters, labels = connected_components(graph, directed=False)
+        sizes = np.bincount(labels, minlength=n_clusters)
+        up = self.rng.random(n_clusters) < expit(2 * self.h * sizes / T)
+        flat[:] = np.where(up[labels], 1, -1)
+        # Every bond may have changed, so a full (vectorised) recount costs
+        # no more than the update itself.
+        self.recompute_totals()
 
     def find_avgs(self, mag_energ):
         mag, energ = mag_energ
@@ -81,43 +257,39 @@ class IsingLattice:
         energ_per_spin = avg_E / total_spins
         return mag_per_spin, energ_per_spin
 
-    def run(self, measure_sweeps=500, equil_sweeps=500, T=2.0):
+    def run(self, measure_sweeps=500, equil_sweeps=500, T=2.0,
+            method="metropolis"):
+        sweep_fn = self.sweeps[method]
         mag = []
         energ = []
         for sweep in range(equil_sweeps):
-            self.one_sweep(T=T)
+            sweep_fn(T=T)
         for sweep in range(measure_sweeps):
-            self.one_sweep(T=T)
+            sweep_fn(T=T)
             energy = self.measure_energy()
             magnetisation = self.measure_magnetisation()
             mag.append(magnetisation)
             energ.append(energy)
         return mag, energ
 
-
-temperatures = np.linspace(1, 4, num=25)
-mag_vals = []
-energ_vals = []
-for i in temperatures:
-    dummy = IsingLattice()
-    info = dummy.run(measure_sweeps=100, equil_sweeps=100, T=i)
-    mag, energ = dummy.find_avgs(info)
-    mag_vals.append(mag)
-    energ_vals.append(energ)
-
-print(f"Length temperatures: {len(temperatures)}")
-print(f"Length mag_vals : {len(mag_vals)}")
-print(f"Length energ_vals: {len(energ_vals)}")
-
-plt.scatter(temperatures, mag_vals, color='blue',
-            marker='x', label="|M| per spin")
-plt.scatter(temperatures, energ_vals, color='red',
-            marker='x', label="E per spin")
-
-plt.xlabel("Temperture (T)")
-plt.ylabel("Magnetisation per spin")
-plt.title("Ising Model Magnetisation and Energy vs Temperature")
-plt.legend()
-plt.grid(True)
-
-plt.show()
+    def sample(self, T=2.0, method="metropolis", equil_sweeps=500,
+               max_sweeps=10000, target_error=None, check_every=1000):
+        """
+        Measure after every sweep into a streaming Accumulator and return
+        the observables.thermodynamics summary, with error bars. With a
+        target_error, measuring stops once the errors of the energy and
+        |M| per spin are both below it, checked every check_every sweeps.
+        """
+        sweep_fn = self.sweeps[method]
+        for sweep in range(equil_sweeps):
+            sweep_fn(T=T)
+        acc = Accumulator(n_observables=5)
+        n_spins = self.lattice.size
+        for sweep in range(1, max_sweeps + 1):
+            sweep_fn(T=T)
+            acc.add(ising_moments(self.energy, self.magnetisation, n_spins))
+            if target_error is not None and sweep % check_every == 0:
+                error = acc.error()
+                if error[0] < target_error and error[2] < target_error:
+                    break
+        return thermodynamics(acc, T, n_spins)
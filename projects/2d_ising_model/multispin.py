@@ -0,0 +1,155 @@
+import math
+
+import numpy as np
+
+"""
+Multi-spin coded Ising lattice.
+
+Spins are stored one per bit in uint64 words: bit b of word w in row i is
+the spin in column 64 w + b, with a set bit meaning spin down. That is 64
+times less memory than an int64 lattice, so L = 32768 fits in 128 MB.
+
+Updates use the checkerboard scheme of IsingLattice.checkerboard_sweep,
+done with bitwise logic on whole words. XOR with a neighbour word marks
+the anti-aligned neighbours, and a bitwise adder counts them. The energy
+change of a flip is 8 - 4 k for k anti-aligned neighbours, so:
+- k >= 2 always flips,
+- k = 1 flips with probability p4 = exp(-4/T),
+- k = 0 flips with probability p8 = p4^2.
+Each random mask has every bit set with a given probability. It is built
+from random words and the binary expansion of that probability, and the p8
+mask is the AND of two independent p4 masks. A colour mask (0x5555... or
+0xAAAA..., depending on the row) picks out one sublattice.
+
+Rows are processed in chunks, so temporary arrays stay small however big
+the lattice is.
+"""
+
+WORD = 64
+EVEN_BITS = np.uint64(0x5555555555555555)
+ODD_BITS = np.uint64(0xAAAAAAAAAAAAAAAA)
+ONE = np.uint64(1)
+TOP = np.uint64(WORD - 1)
+
+
+def popcount(words) -> int:
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(np.unpackbits(np.ascontiguousarray(words).view(np.uint8)).sum(dtype=np.int64))
+
+
+def probability_digits(p: float, precision: int) -> list:
+    # Binary digits of p, most significant first, without trailing zeros.
+    digits = []
+    for _ in range(precision):
+        p *= 2
+        digits.append(p >= 1)
+        p -= digits[-1]
+    while digits and not digits[-1]:
+        digits.pop()
+    return digits
+
+
+class MultiSpinLattice:
+    def __init__(self, L=1024, seed=None, precision=24, chunk_words=2**16):
+        if L % WORD:
+            raise ValueError(f"The lattice size must be a multiple of {WORD}.")
+        self.L = L
+        self.n_words = L // WORD
+        self.rng = np.random.default_rng(seed)
+        self.precision = precision
+        self.chunk_rows = max(1, chunk_words // self.n_words)
+        self.words = self.random_words((L, self.n_words))
+        self._digits = {}
+
+    @classmethod
+    def from_spins(cls, spins, **kwargs):
+        lattice = cls(L=len(spins), **kwargs)
+        bits = np.packbits(np.asarray(spins) < 0, axis=1, bitorder='little')
+        lattice.words = bits.view('<u8').astype(np.uint64)
+        return lattice
+
+    def to_spins(self) -> np.ndarray:
+        bytes_ = self.words.astype('<u8').view(np.uint8)
+        bits = np.unpackbits(bytes_, axis=1, bitorder='little')
+        return 1 - 2 * bits.astype(np.int64)
+
+    def random_words(self, shape) -> np.ndarray:
+        count = math.prod(shape)
+        return self.rng.bit_generator.random_raw(count).astype(np.uint64).reshape(shape)
+
+    def random_mask(self, digits, shape) -> np.ndarray:
+        # Working from the least significant digit, OR-ing in a random word
+        # for a 1 and AND-ing for a 0 maps the probability P to (1 + P)/2 or
+        # P/2, which leaves each bit set with probability 0.d1 d2 ... dn.
+        mask = np.zeros(shape, dtype=np.uint64)
+        for digit in reversed(digits):
+            if digit:
+                mask |= self.random_words(shape)
+            else:
+                mask &= self.random_words(shape)
+        return mask
+
+    def flip_masks(self, rows, T):
+        """Bits of the words in `rows` that would flip in a Metropolis update."""
+        if T not in self._digits:
+            self._digits[T] = probability_digits(math.exp(-4 / T), self.precision)
+        digits = self._digits[T]
+        L = self.L
+        spins = self.words[rows]
+        up = self.words[(rows - 1) % L]
+        down = self.words[(rows + 1) % L]
+        right = (spins >> ONE) | (np.roll(spins, -1, axis=1) << TOP)
+        left = (spins << ONE) | (np.roll(spins, 1, axis=1) >> TOP)
+
+        # Bitwise sum of the four anti-aligned flags.
+        a, b, c, d = spins ^ up, spins ^ down, spins ^ left, spins ^ right
+        s1, c1 = a ^ b, a & b
+        s2, c2 = c ^ d, c & d
+        at_least_two = c1 | c2 | (s1 & s2)
+        exactly_one = (s1 ^ s2) & ~at_least_two
+        none = ~(a | b | c | d)
+
+        shape = spins.shape
+        p4 = self.random_mask(digits, shape)
+        p8 = p4 & self.random_mask(digits, shape)
+        return at_least_two | (exactly_one & p4) | (none & p8)
+
+    def half_sweep(self, T, colour):
+        # Sites of one colour never neighbour each other and the flips only
+        # read bits of the other colour, so the chunks can be updated in
+        # place one after another.
+        for start in range(0, self.L, self.chunk_rows):
+            rows = np.arange(start, min(start + self.chunk_rows, self.L))
+            parity = (rows + colour) % 2 == 0
+            colour_mask = np.where(parity, EVEN_BITS, ODD_BITS)[:, None]
+            self.words[rows] ^= self.flip_masks(rows, T) & colour_mask
+
+    def sweep(self, T):
+        self.half_sweep(T, 0)
+        self.half_sweep(T, 1)
+
+    def measure_magnetisation(self):
+        return abs(self.L * self.L - 2 * popcount(self.words))
+
+    def measure_energy(self):
+        spins = self.words
+        right = (spins >> ONE) | (np.roll(spins, -1, axis=1) << TOP)
+        anti = popcount(spins ^ np.roll(spins, -1, axis=0)) + popcount(spins ^ right)
+        return 2 * anti - 2 * self.L * self.L
+
+    def find_avgs(self, mag_energ):
+        mag, energ = mag_energ
+        total_spins = self.L * self.L
+        return sum(mag) / len(mag) / total_spins, sum(energ) / len(energ) / total_spins
+
+    def run(self, measure_sweeps=500, equil_sweeps=500, T=2.0):
+        mag = []
+        energ = []
+        for sweep in range(equil_sweeps):
+            self.sweep(T=T)
+        for sweep in range(measure_sweeps):
+            self.sweep(T=T)
+            mag.append(self.measure_magnetisation())
+            energ.append(self.measure_energy())
+        return mag, energ
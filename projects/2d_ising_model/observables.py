@@ -0,0 +1,154 @@
+import numpy as np
+
+"""
+Streaming error analysis for Monte Carlo time series.
+
+Accumulator takes one measurement (a vector of observables) at a time and
+never stores the series:
+- Binning analysis keeps running sums of the block means for block sizes
+  1, 2, 4, ..., which is O(log n) memory. The error of the mean rises with
+  the block size until the blocks are longer than the autocorrelation
+  time, then levels off at the true error. The integrated autocorrelation
+  time follows from tau = (error / naive error)^2 / 2.
+- A fixed number of jackknife bins (between n_bins and 2 n_bins) is kept
+  by merging neighbouring bins whenever they fill up. The bins give errors
+  for nonlinear functions of the means, such as the specific heat,
+  susceptibility and Binder cumulant.
+"""
+
+MIN_BLOCKS = 32
+
+
+class Accumulator:
+
+    def __init__(self, n_observables: int = 1, n_bins: int = 64):
+        self.n_observables = n_observables
+        self.n_bins = n_bins
+        self.count = 0
+        self.sums = []
+        self.squares = []
+        self.blocks = []
+        self.pending = []
+        self.bins = np.zeros((2 * n_bins, n_observables))
+        self.n_filled = 0
+        self.bin_size = 1
+        self.partial = np.zeros(n_observables)
+        self.partial_count = 0
+
+    def add(self, x) -> None:
+        x = np.asarray(x, dtype=float).reshape(self.n_observables)
+        self.count += 1
+
+        level = 0
+        value = x
+        while True:
+            if level == len(self.sums):
+                self.sums.append(np.zeros(self.n_observables))
+                self.squares.append(np.zeros(self.n_observables))
+                self.blocks.append(0)
+                self.pending.append(None)
+            self.sums[level] += value
+            self.squares[level] += value**2
+            self.blocks[level] += 1
+            if self.pending[level] is None:
+                self.pending[level] = value
+                break
+            value = 0.5 * (self.pending[level] + value)
+            self.pending[level] = None
+            level += 1
+
+        self.partial += x
+        self.partial_count += 1
+        if self.partial_count == self.bin_size:
+            self.bins[self.n_filled] = self.partial / self.bin_size
+            self.n_filled += 1
+            self.partial[:] = 0
+            self.partial_count = 0
+            if self.n_filled == len(self.bins):
+                self.bins[:self.n_bins] = 0.5 * (self.bins[0::2] + self.bins[1::2])
+                self.n_filled = self.n_bins
+                self.bin_size *= 2
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.sums[0] / self.count
+
+    def binning_errors(self) -> np.ndarray:
+        """Error of the mean from each block size 2^k with two or more blocks."""
+        errors = []
+        for total, squares, blocks in zip(self.sums, self.squares, self.blocks):
+            if blocks < 2:
+                break
+            mean = total / blocks
+            variance = np.maximum(squares / blocks - mean**2, 0) * blocks / (blocks - 1)
+            errors.append(np.sqrt(variance / blocks))
+        return np.array(errors).reshape(-1, self.n_observables)
+
+    def error(self, min_blocks: int = MIN_BLOCKS) -> np.ndarray:
+        # The largest error among the block sizes that still have enough
+        # blocks to be trusted, which is the plateau once the series is
+        # long compared with the autocorrelation time.
+        errors = self.binning_errors()
+        if len(errors) == 0:
+            return np.full(self.n_observables, np.inf)
+        usable = [e for e, b in zip(errors, self.blocks) if b >= min_blocks]
+        return np.max(usable or errors[:1], axis=0)
+
+    def tau_int(self, min_blocks: int = MIN_BLOCKS) -> np.ndarray:
+        errors = self.binning_errors()
+        if len(errors) == 0:
+            return np.full(self.n_observables, np.nan)
+        naive = errors[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(naive > 0, 0.5 * (self.error(min_blocks) / naive) ** 2, np.nan)
+
+    def jackknife(self, func):
+        """Value and jackknife error of func(means) over the complete bins."""
+        bins = self.bins[:self.n_filled]
+        n = len(bins)
+        value = np.asarray(func(self.mean))
+        if n < 2:
+            return value, np.full(value.shape, np.inf)
+        leave_one_out = (bins.sum(axis=0) - bins) / (n - 1)
+        values = np.array([func(m) for m in leave_one_out])
+        error = np.sqrt((n - 1) / n * np.sum((values - values.mean(axis=0)) ** 2, axis=0))
+        return value, error
+
+
+def ising_moments(energy, magnetisation, n_spins) -> np.ndarray:
+    """The per-spin moments needed for the thermodynamic quantities."""
+    e = energy / n_spins
+    m = abs(magnetisation) / n_spins
+    return np.array([e, e**2, m, m**2, m**4])
+
+
+def thermodynamics(acc: Accumulator, T, n_spins) -> dict:
+    """Means, errors and autocorrelation times from ising_moments samples."""
+    def specific_heat(m):
+        return n_spins * (m[1] - m[0]**2) / T**2
+
+    def susceptibility(m):
+        return n_spins * (m[3] - m[2]**2) / T
+
+    def binder(m):
+        return 1 - m[4] / (3 * m[3]**2) if m[3] > 0 else np.nan
+
+    error = acc.error()
+    tau = acc.tau_int()
+    results = {
+        'T': T,
+        'sweeps': acc.count,
+        'energy': float(acc.mean[0]),
+        'energy_err': float(error[0]),
+        'magnetisation': float(acc.mean[2]),
+        'magnetisation_err': float(error[2]),
+        'tau_energy': float(tau[0]),
+        'tau_magnetisation': float(tau[2]),
+    }
+    for name, func in (('specific_heat', specific_heat),
+                       ('susceptibility', susceptibility),
+                       ('binder', binder)):
+        value, err = acc.jackknife(func)
+        results[name] = float(value)
+        results[name + '_err'] = float(err)
+    return results
@@ -0,0 +1,154 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize_scalar
+from scipy.special import logsumexp
+
+from .main import IsingLattice
+
+"""
+Ferrenberg-Swendsen histogram reweighting.
+
+A run at temperature T_k samples states with probability exp(-E/T_k) / Z_k,
+so its samples also say how likely each state is at any nearby T. With
+several runs, the multiple histogram equations weight each sample by
+
+    w_n(T) = exp(-E_n/T) / sum_k N_k exp(-E_n/T_k - ln Z_k),
+
+where the ln Z_k are solved self-consistently. The averages over the
+pooled samples then give smooth curves in T that are accurate wherever
+the runs' energy histograms overlap. One run is the single histogram
+method.
+
+The sums run over the raw samples rather than binned histograms, and
+are done with log-sum-exp so that nothing overflows on large lattices.
+Errors come from a block jackknife: each run is cut into n_blocks
+contiguous blocks, block b of every run is left out in turn, and the
+whole analysis is repeated.
+
+    runs = record_runs(32, [2.2, 2.27, 2.35], 5000, 1000, method="wolff")
+    histogram = MultipleHistogram(*runs, n_spins=32**2)
+    histogram.curves(np.linspace(2.15, 2.4, 101))
+    histogram.peak('specific_heat', (2.2, 2.35))
+"""
+
+QUANTITIES = ('energy', 'magnetisation', 'specific_heat', 'susceptibility', 'binder')
+
+
+def record_chain(L, T, seed, measure_sweeps, equil_sweeps, method):
+    lattice = IsingLattice(L=L, seed=seed)
+    mag, energ = lattice.run(measure_sweeps=measure_sweeps, equil_sweeps=equil_sweeps,
+                             T=T, method=method)
+    return np.array(energ, dtype=float), np.array(mag, dtype=float)
+
+
+def record_runs(L, temperatures, measure_sweeps=5000, equil_sweeps=1000,
+                method="checkerboard", seed=None, max_workers=None):
+    """Energy and |M| time series at each temperature, one process each."""
+    n = len(temperatures)
+    seeds = np.random.SeedSequence(seed).spawn(n)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        series = list(pool.map(record_chain, [L] * n, temperatures, seeds,
+                               [measure_sweeps] * n, [equil_sweeps] * n, [method] * n))
+    energies = [e for e, _ in series]
+    magnetisations = [m for _, m in series]
+    return list(temperatures), energies, magnetisations
+
+
+def solve_log_partition(beta, energies, counts, log_z=None, tol=1e-10, max_iter=100000):
+    """
+    Iterate the multiple histogram equations for ln Z_k at each beta_k,
+    with ln Z_0 fixed at 0. `energies` are the pooled samples of all runs.
+    """
+    log_counts = np.log(counts)[:, None]
+    exponents = -beta[:, None] * energies[None, :]
+    log_z = np.zeros(len(beta)) if log_z is None else log_z.copy()
+    for _ in range(max_iter):
+        log_denominator = logsumexp(log_counts + exponents - log_z[:, None], axis=0)
+        new = logsumexp(exponents - log_denominator[None, :], axis=1)
+        new -= new[0]
+        if np.max(np.abs(new - log_z)) < tol:
+            return new, log_denominator
+        log_z = new
+    raise RuntimeError("The multiple histogram equations did not converge.")
+
+
+class MultipleHistogram:
+
+    def __init__(self, temperatures, energies, magnetisations, n_spins, n_blocks=10):
+        self.temperatures = np.asarray(temperatures, dtype=float)
+        self.beta = 1 / self.temperatures
+        self.n_spins = n_spins
+        self.n_blocks = n_blocks
+        self.energies = np.concatenate([np.asarray(e, dtype=float) for e in energies])
+        self.magnetisations = np.abs(np.concatenate([np.asarray(m, dtype=float)
+                                                     for m in magnetisations]))
+        self.run = np.concatenate([np.full(len(e), k) for k, e in enumerate(energies)])
+        self.block = np.concatenate([np.arange(len(e)) * n_blocks // len(e) for e in energies])
+        # Shift the energies so the exponents stay small; this only
+        # rescales every Z by the same factor.
+        self.offset = self.energies.mean()
+        self.log_z, self.log_denominator = self.solve(np.ones(len(self.energies), dtype=bool))
+
+    def solve(self, keep, log_z=None):
+        counts = np.bincount(self.run[keep], minlength=len(self.beta))
+        return solve_log_partition(self.beta, self.energies[keep] - self.offset,
+                                   counts, log_z)
+
+    def moments(self, temperatures, keep=None, log_denominator=None) -> np.ndarray:
+        """Per-spin moments e, e^2, |m|, m^2, m^4 at each temperature."""
+        if keep is None:
+            keep = slice(None)
+            log_denominator = self.log_denominator
+        beta = 1 / np.atleast_1d(np.asarray(temperatures, dtype=float))
+        log_w = -beta[:, None] * (self.energies[keep] - self.offset)[None, :] - log_denominator
+        w = np.exp(log_w - logsumexp(log_w, axis=1, keepdims=True))
+        e = self.energies[keep] / self.n_spins
+        m = self.magnetisations[keep] / self.n_spins
+        return np.stack([w @ e, w @ e**2, w @ m, w @ m**2, w @ m**4], axis=-1)
+
+    def quantities(self, temperatures, moments) -> np.ndarray:
+        T = np.atleast_1d(np.asarray(temperatures, dtype=float))
+        e, e2, m, m2, m4 = moments.T
+        return np.stack([
+            e,
+            m,
+            self.n_spins * (e2 - e**2) / T**2,
+            self.n_spins * (m2 - m**2) / T,
+            1 - m4 / (3 * m2**2),
+        ], axis=-1)
+
+    def jackknife(self, temperatures) -> np.ndarray:
+        estimates = []
+        for b in range(self.n_blocks):
+            keep = self.block != b
+            log_z, log_denominator = self.solve(keep, self.log_z)
+            moments = self.moments(temperatures, keep, log_denominator)
+            estimates.append(self.quantities(temperatures, moments))
+        estimates = np.array(estimates)
+        n = len(estimates)
+        return np.sqrt((n - 1) / n * np.sum((estimates - estimates.mean(axis=0)) ** 2, axis=0))
+
+    def curves(self, temperatures, errors: bool = True) -> pd.DataFrame:
+        """Reweighted observables per spin at each temperature."""
+        temperatures = np.atleast_1d(np.asarray(temperatures, dtype=float))
+        values = self.quantities(temperatures, self.moments(temperatures))
+        table = pd.DataFrame(values, columns=QUANTITIES)
+        table.insert(0, 'T', temperatures)
+        if errors:
+            error = self.jackknife(temperatures)
+            for i, name in enumerate(QUANTITIES):
+                table[name + '_err'] = error[:, i]
+        return table
+
+    def peak(self, quantity: str, bounds) -> tuple:
+        """Temperature and height of the maximum of a quantity within bounds."""
+        column = QUANTITIES.index(quantity)
+
+        def negative(T):
+            return -self.quantities(T, self.moments(T))[0, column]
+
+        result = minimize_scalar(negative, bounds=bounds, method='bounded',
+                                 options={'xatol': 1e-6})
+        return float(result.x), float(-result.fun)
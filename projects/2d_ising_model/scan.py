@@ -0,0 +1,150 @@
+import argparse
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from .main import IsingLattice
+
+"""
+Temperature scans of the 2D Ising model.
+
+temperature_scan runs one independent chain per temperature in a process
+pool. parallel_tempering runs one replica per temperature in a single
+process and periodically tries to swap the configurations of neighbouring
+temperatures, so low temperature replicas can escape metastable states by
+visiting high temperatures.
+
+Random streams come from np.random.SeedSequence(seed).spawn, so each chain
+has an independent stream and the same seed gives the same results
+whatever the number of workers.
+
+    python -m projects.2d_ising_model.scan --L 64 --method wolff
+    python -m projects.2d_ising_model.scan --L 32 --tmin 1.5 --tmax 3.0 --tempering
+"""
+
+
+def run_chain(L, T, seed, measure_sweeps=500, equil_sweeps=500,
+              method="checkerboard", target_error=None) -> dict:
+    lattice = IsingLattice(L=L, seed=seed)
+    return lattice.sample(T=T, method=method, equil_sweeps=equil_sweeps,
+                          max_sweeps=measure_sweeps, target_error=target_error,
+                          check_every=max(1, min(1000, measure_sweeps)))
+
+
+def temperature_scan(L, temperatures, measure_sweeps=500, equil_sweeps=500,
+                     method="checkerboard", seed=None, max_workers=None,
+                     target_error=None) -> pd.DataFrame:
+    """
+    Observables with error bars at each temperature, one independent chain
+    each (see IsingLattice.sample). With a target_error, measure_sweeps is
+    the most any chain will run.
+    """
+    temperatures = np.asarray(temperatures, dtype=float)
+    seeds = np.random.SeedSequence(seed).spawn(len(temperatures))
+    n = len(temperatures)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        rows = list(pool.map(run_chain, [L] * n, temperatures, seeds,
+                             [measure_sweeps] * n, [equil_sweeps] * n, [method] * n,
+                             [target_error] * n))
+    return pd.DataFrame(rows)
+
+
+def parallel_tempering(L, temperatures, measure_sweeps=500, equil_sweeps=500,
+                       method="checkerboard", swap_every=1, seed=None) -> pd.DataFrame:
+    """
+    Replica exchange over a sorted temperature grid. A swap between
+    neighbouring temperatures i and i + 1 is accepted with probability
+    min(1, exp((1/T_i - 1/T_i+1) (E_i - E_i+1))). Even and odd pairs are
+    tried alternately. The swap_acceptance column is for the pair (i, i + 1).
+    """
+    temperatures = np.sort(np.asarray(temperatures, dtype=float))
+    n = len(temperatures)
+    seeds = np.random.SeedSequence(seed).spawn(n + 1)
+    replicas = [IsingLattice(L=L, seed=s) for s in seeds[:n]]
+    rng = np.random.default_rng(seeds[n])
+    beta = 1 / temperatures
+    # order[i] is the replica currently at temperature i.
+    order = list(range(n))
+    attempts = np.zeros(max(n - 1, 0))
+    accepted = np.zeros(max(n - 1, 0))
+    mag = np.zeros(n)
+    energ = np.zeros(n)
+
+    for sweep in range(equil_sweeps + measure_sweeps):
+        for i, T in enumerate(temperatures):
+            replicas[order[i]].sweeps[method](T=T)
+        if sweep >= equil_sweeps:
+            for i in range(n):
+                mag[i] += replicas[order[i]].measure_magnetisation()
+                energ[i] += replicas[order[i]].measure_energy()
+        if sweep % swap_every == 0:
+            for i in range((sweep // swap_every) % 2, n - 1, 2):
+                delta = (beta[i] - beta[i + 1]) * (replicas[order[i]].energy
+                                                   - replicas[order[i + 1]].energy)
+                attempts[i] += 1
+                if delta >= 0 or rng.random() < math.exp(delta):
+                    order[i], order[i + 1] = order[i + 1], order[i]
+                    accepted[i] += 1
+
+    spins = L * L * max(measure_sweeps, 1)
+    with np.errstate(invalid='ignore'):
+        swap_acceptance = np.append(accepted / attempts, np.nan)
+    return pd.DataFrame({
+        'T': temperatures,
+        'magnetisation': mag / spins,
+        'energy': energ / spins,
+        'swap_acceptance': swap_acceptance[:n],
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan the 2D Ising model over temperature.")
+    parser.add_argument('--L', type=int, default=25)
+    parser.add_argument('--tmin', type=float, default=1.0)
+    parser.add_argument('--tmax', type=float, default=4.0)
+    parser.add_argument('--num', type=int, default=25)
+    parser.add_argument('--sweeps', type=int, default=500)
+    parser.add_argument('--equil', type=int, default=500)
+    parser.add_argument('--method', default="checkerboard")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--target-error', type=float, default=None,
+                        help="Stop each chain once E and |M| per spin are this accurate.")
+    parser.add_argument('--tempering', action='store_true',
+                        help="Use replica exchange instead of independent chains.")
+    args = parser.parse_args(argv)
+
+    temperatures = np.linspace(args.tmin, args.tmax, num=args.num)
+    if args.tempering:
+        results = parallel_tempering(args.L, temperatures, args.sweeps, args.equil,
+                                     args.method, seed=args.seed)
+    else:
+        results = temperature_scan(args.L, temperatures, args.sweeps, args.equil,
+                                   args.method, args.seed, args.workers,
+                                   args.target_error)
+    print(results.to_string(index=False))
+
+    if 'energy_err' in results:
+        plt.errorbar(results['T'], results['magnetisation'], results['magnetisation_err'],
+                     color='blue', fmt='x', label="|M| per spin")
+        plt.errorbar(results['T'], results['energy'], results['energy_err'],
+                     color='red', fmt='x', label="E per spin")
+    else:
+        plt.scatter(results['T'], results['magnetisation'], color='blue',
+                    marker='x', label="|M| per spin")
+        plt.scatter(results['T'], results['energy'], color='red',
+                    marker='x', label="E per spin")
+    plt.xlabel("Temperature (T)")
+    plt.ylabel("Magnetisation and energy per spin")
+    plt.title("Ising Model Magnetisation and Energy vs Temperature")
+    plt.legend()
+    plt.grid(True)
+    plt.show()
+    return results
+
+
+if __name__ == "__main__":
+    main()
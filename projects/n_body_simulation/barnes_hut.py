@@ -0,0 +1,246 @@
+import numpy as np
+import time
+
+from .particles import ParticleSystem, direct_accelerations
+
+"""
+Barnes-Hut gravity for the 2D N-body problem.
+
+The tree is rebuilt from scratch every step. Particles are sorted along a
+Morton (Z-order) curve, which makes every quadtree node a contiguous range
+of the sorted particles, so the tree can be built one level at a time with
+searchsorted and stored in flat NumPy arrays. Node masses and centres of
+mass come from cumulative sums over the sorted particles.
+
+The walk is also done level by level: every (particle, node) pair on the
+current frontier is either accepted (node width / distance < theta), summed
+directly (leaf), or replaced by the pairs with the node's children.
+"""
+
+MAX_DEPTH = 21
+CHUNK_SIZE = 4096
+
+
+def spread_bits(x):
+    # Insert a zero bit between each of the low 32 bits of x.
+    x = x.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x3333333333333333)
+    x = (x | (x << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return x
+
+
+def morton_codes(pos, corner, width, depth=MAX_DEPTH):
+    # x bits sit in the even and y bits in the odd positions, so the two
+    # bits of each level give the quadrant as (y << 1) | x.
+    cells = 2 ** depth
+    grid = np.floor((pos - corner) / width * cells)
+    grid = np.clip(grid, 0, cells - 1).astype(np.uint64)
+    codes = spread_bits(grid[:, 0]) | (spread_bits(grid[:, 1]) << np.uint64(1))
+    return codes.astype(np.int64)
+
+
+class QuadTree:
+
+    def __init__(self, pos, mass, leaf_size=8, max_depth=MAX_DEPTH):
+        self.pos = np.asarray(pos, dtype=float)
+        self.mass = np.asarray(mass, dtype=float)
+        self.leaf_size = leaf_size
+        self.max_depth = max_depth
+        self.build()
+
+    def build(self):
+        n = len(self.mass)
+        lo = self.pos.min(axis=0) if n else np.zeros(2)
+        hi = self.pos.max(axis=0) if n else np.ones(2)
+        width = max(float(np.max(hi - lo)), 1e-12) * (1 + 1e-9)
+        centre = 0.5 * (lo + hi)
+        corner = centre - 0.5 * width
+
+        codes = morton_codes(self.pos, corner, width, self.max_depth)
+        self.order = np.argsort(codes, kind='stable')
+        self.rank = np.empty(n, dtype=np.int64)
+        self.rank[self.order] = np.arange(n)
+        codes = codes[self.order]
+
+        starts, stops, depths, centres = [], [], [], []
+        first_child, n_children = [], []
+
+        prefix = np.zeros(1, dtype=np.int64)
+        start = np.zeros(1, dtype=np.int64)
+        stop = np.full(1, n, dtype=np.int64)
+        level_centre = centre[None, :]
+        depth = 0
+        total = 0
+        while len(start):
+            count = len(start)
+            split = (stop - start > self.leaf_size) & (depth < self.max_depth)
+
+            shift = 2 * (self.max_depth - depth - 1)
+            bounds = (prefix[split, None] * 4 + np.arange(5)) << max(shift, 0)
+            edges = np.searchsorted(codes, bounds)
+            child_start = edges[:, :4]
+            child_stop = edges[:, 1:]
+            occupied = child_stop > child_start
+
+            kids = np.zeros(count, dtype=np.int64)
+            kids[split] = occupied.sum(axis=1)
+            offsets = total + count + np.cumsum(kids) - kids
+
+            starts.append(start)
+            stops.append(stop)
+            depths.append(np.full(count, depth))
+            centres.append(level_centre)
+            first_child.append(np.where(kids > 0, offsets, -1))
+            n_children.append(kids)
+            total += count
+
+            quadrant = np.broadcast_to(np.arange(4), occupied.shape)[occupied]
+            parent = np.repeat(np.flatnonzero(split), occupied.sum(axis=1))
+            quarter = 0.25 * width / 2 ** depth
+            sign = np.stack([np.where(quadrant & 1, 1.0, -1.0),
+                             np.where(quadrant & 2, 1.0, -1.0)], axis=1)
+            level_centre = level_centre[parent] + quarter * sign
+            prefix = prefix[parent] * 4 + quadrant
+            start = child_start[occupied]
+            stop = child_stop[occupied]
+            depth += 1
+
+        self.start = np.concatenate(starts)
+        self.stop = np.concatenate(stops)
+        self.depth = np.concatenate(depths)
+        self.centre = np.concatenate(centres)
+        self.first_child = np.concatenate(first_child)
+        self.n_children = np.concatenate(n_children)
+        self.width = width / 2.0 ** self.depth
+        self.is_leaf = self.n_children == 0
+
+        sorted_mass = self.mass[self.order]
+        cum_mass = np.concatenate([[0.0], np.cumsum(sorted_mass)])
+        cum_moment = np.concatenate(
+            [np.zeros((1, 2)), np.cumsum(sorted_mass[:, None] * self.pos[self.order], axis=0)])
+        self.node_mass = cum_mass[self.stop] - cum_mass[self.start]
+        moment = cum_moment[self.stop] - cum_moment[self.start]
+        safe = np.where(self.node_mass > 0, self.node_mass, 1.0)
+        self.com = np.where(self.node_mass[:, None] > 0, moment / safe[:, None], self.centre)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.start)
+
+    def accelerations(self, G, theta=0.5, softening=0.0, out=None,
+                      chunk_size=CHUNK_SIZE):
+        n = len(self.mass)
+        if out is None:
+            out = np.zeros((n, 2))
+        out[:] = 0.0
+        for chunk_start in range(0, n, chunk_size):
+            targets = np.arange(chunk_start, min(chunk_start + chunk_size, n))
+            out[targets] = self.walk(targets, G, theta, softening)
+        return out
+
+    def walk(self, targets, G, theta, softening):
+        eps2 = softening ** 2
+        acc = np.zeros((len(targets), 2))
+        local = np.arange(len(targets))
+        node = np.zeros(len(targets), dtype=np.int64)
+        rank = self.rank[targets]
+        while len(local):
+            x = self.pos[targets[local]]
+            r_vec = self.com[node] - x
+            r2 = np.einsum('ij,ij->i', r_vec, r_vec)
+            inside = (rank[local] >= self.start[node]) & (rank[local] < self.stop[node])
+            accept = (self.width[node] ** 2 < theta ** 2 * r2) & ~inside
+            leaf = self.is_leaf[node] & ~accept
+
+            if accept.any():
+                weight = G * self.node_mass[node[accept]] * (r2[accept] + eps2) ** -1.5
+                self.accumulate(acc, local[accept], weight[:, None] * r_vec[accept])
+
+            if leaf.any():
+                leaf_local = local[leaf]
+                leaf_node = node[leaf]
+                counts = self.stop[leaf_node] - self.start[leaf_node]
+                pair_local = np.repeat(leaf_local, counts)
+                offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                source = self.order[np.repeat(self.start[leaf_node], counts) + offset]
+                r_src = self.pos[source] - self.pos[targets[pair_local]]
+                d2 = np.einsum('ij,ij->i', r_src, r_src)
+                keep = d2 > 0
+                weight = G * self.mass[source[keep]] * (d2[keep] + eps2) ** -1.5
+                self.accumulate(acc, pair_local[keep], weight[:, None] * r_src[keep])
+
+            opened = ~accept & ~leaf
+            parent = node[opened]
+            counts = self.n_children[parent]
+            local = np.repeat(local[opened], counts)
+            offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            node = np.repeat(self.first_child[parent], counts) + offset
+        return acc
+
+    @staticmethod
+    def accumulate(acc, index, values):
+        acc[:, 0] += np.bincount(index, weights=values[:, 0], minlength=len(acc))
+        acc[:, 1] += np.bincount(index, weights=values[:, 1], minlength=len(acc))
+
+
+def barnes_hut_accelerations(pos, mass, G, theta=0.5, softening=0.0,
+                             leaf_size=8, out=None):
+    tree = QuadTree(pos, mass, leaf_size)
+    return tree.accelerations(G, theta, softening, out=out)
+
+
+def accuracy_report(system: ParticleSystem, thetas=(0.3, 0.5, 0.7, 1.0),
+                    leaf_size=8):
+    """
+    Compare tree forces against direct summation for the same snapshot.
+    Returns one row per opening angle with timings and relative errors.
+    """
+    t0 = time.perf_counter()
+    exact = direct_accelerations(system.pos, system.pos, system.mass,
+                                 system.G, system.softening)
+    direct_time = time.perf_counter() - t0
+    exact_mag = np.linalg.norm(exact, axis=1)
+    exact_mag[exact_mag == 0] = 1.0
+
+    rows = []
+    for theta in thetas:
+        t0 = time.perf_counter()
+        tree = QuadTree(system.pos, system.mass, leaf_size)
+        build_time = time.perf_counter() - t0
+        approx = tree.accelerations(system.G, theta, system.softening)
+        tree_time = time.perf_counter() - t0
+        error = np.linalg.norm(approx - exact, axis=1) / exact_mag
+        rows.append({
+            'n': system.n,
+            'theta': theta,
+            'nodes': tree.n_nodes,
+            'direct_time': direct_time,
+            'build_time': build_time,
+            'tree_time': tree_time,
+            'speedup': direct_time / tree_time,
+            'rms_error': float(np.sqrt(np.mean(error**2))),
+            'p99_error': float(np.percentile(error, 99)),
+            'max_error': float(error.max()),
+        })
+    return rows
+
+
+def print_report(rows):
+    print(f"{'N':>7} {'theta':>6} {'nodes':>7} {'direct s':>9} {'tree s':>8} "
+          f"{'speedup':>8} {'rms err':>9} {'p99 err':>9} {'max err':>9}")
+    for row in rows:
+        print(f"{row['n']:>7} {row['theta']:>6.2f} {row['nodes']:>7} "
+              f"{row['direct_time']:>9.3f} {row['tree_time']:>8.3f} "
+              f"{row['speedup']:>8.2f} {row['rms_error']:>9.2e} "
+              f"{row['p99_error']:>9.2e} {row['max_error']:>9.2e}")
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    for n in (1000, 10000, 50000):
+        system = ParticleSystem(rng.normal(size=(n, 2)), np.zeros((n, 2)),
+                                np.full(n, 1.0 / n), softening=1e-3)
+        print_report(accuracy_report(system))
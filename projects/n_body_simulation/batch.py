@@ -0,0 +1,175 @@
+import argparse
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from .main import Simulation, load_system
+
+"""
+Headless entry point for the N-body code. Nothing here imports tkinter or
+matplotlib, so it runs on machines without a display.
+
+    python -m projects.n_body_simulation.batch run initial.csv --dt 0.001 --steps 10000 --output traj.npy
+    python -m projects.n_body_simulation.batch run initial.csv --dt 0.001 --steps 10000 --checkpoint run.ckpt.npz --checkpoint-every 1000
+    python -m projects.n_body_simulation.batch resume run.ckpt.npz
+    python -m projects.n_body_simulation.batch sweep a.csv b.npz --dt 0.01 0.001 --steps 10000 --summary summary.csv
+
+Initial conditions are either a CSV file (x, y, vx, vy, mass, name) or a
+.npz snapshot written by initial_conditions.save_snapshot.
+
+Every run builds its own ParticleSystem and Simulation, so runs in
+different worker processes never share state. A run without an output
+file only keeps its first and last frames, so memory does not grow with
+the number of steps.
+"""
+
+DEFAULTS = {
+    'method': "direct",
+    'integrator': "leapfrog",
+    'theta': 0.5,
+    'box_size': None,
+    'grid': 128,
+    'softening': None,
+    'record_every': 1,
+    'diagnostics_every': 100,
+    'output': None,
+    'checkpoint': None,
+    'checkpoint_every': 0,
+}
+
+
+def run_config(config: dict) -> dict:
+    config = {**DEFAULTS, **config}
+    kwargs = {} if config['softening'] is None else {'softening': config['softening']}
+    system = load_system(config['initial'], **kwargs)
+    sim = Simulation(system, method=config['method'], theta=config['theta'],
+                     integrator=config['integrator'],
+                     box_size=config['box_size'], grid=config['grid'])
+
+    record_every = config['record_every']
+    if config['output'] is None:
+        # Frames that are not written anywhere would only be thrown away.
+        record_every = max(1, config['steps'])
+    start = time.perf_counter()
+    sim.run(config['dt'], config['steps'], record_every,
+            config['output'], config['diagnostics_every'],
+            config['checkpoint'], config['checkpoint_every'])
+    return summarise(sim, config['initial'], time.perf_counter() - start)
+
+
+def resume_run(checkpoint) -> dict:
+    sim = Simulation.resume(checkpoint)
+    start = time.perf_counter()
+    sim.continue_run()
+    return summarise(sim, checkpoint, time.perf_counter() - start)
+
+
+def summarise(sim: Simulation, initial, wall_time: float) -> dict:
+    params = sim.run_params
+    return {
+        'initial': str(initial),
+        'n': sim.system.n,
+        'dt': params['dt'],
+        'steps': params['steps'],
+        'method': sim.method,
+        'integrator': sim.integrator.name,
+        'output': params['trajectory_path'],
+        'frames': len(sim.trajectory),
+        'wall_time': wall_time,
+        'force_evaluations': sim.force_evaluations,
+        **sim.diagnostics.summary(),
+    }
+
+
+def sweep_configs(initials, dts, steps, output_dir=None, **options) -> list:
+    configs = []
+    for initial, dt in itertools.product(initials, dts):
+        config = {'initial': initial, 'dt': dt, 'steps': steps, **options}
+        if output_dir is not None:
+            config['output'] = Path(output_dir) / f"{Path(initial).stem}_dt{dt:g}.npy"
+        configs.append(config)
+    return configs
+
+
+def run_sweep(configs, max_workers=None) -> pd.DataFrame:
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        rows = list(pool.map(run_config, configs))
+    return pd.DataFrame(rows)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Headless N-body runs and parameter sweeps.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_options(sub):
+        sub.add_argument('--steps', type=int, required=True)
+        sub.add_argument('--method', choices=Simulation.force_methods, default=DEFAULTS['method'])
+        sub.add_argument('--integrator', default=DEFAULTS['integrator'])
+        sub.add_argument('--theta', type=float, default=DEFAULTS['theta'])
+        sub.add_argument('--box-size', type=float, default=DEFAULTS['box_size'])
+        sub.add_argument('--grid', type=int, default=DEFAULTS['grid'])
+        sub.add_argument('--softening', type=float, default=DEFAULTS['softening'])
+        sub.add_argument('--record-every', type=int, default=DEFAULTS['record_every'])
+        sub.add_argument('--diagnostics-every', type=int, default=DEFAULTS['diagnostics_every'])
+
+    run = commands.add_parser('run', help="Run one simulation.")
+    run.add_argument('initial', help="Initial condition file.")
+    run.add_argument('--dt', type=float, required=True)
+    run.add_argument('--output', help="Trajectory .npy file.")
+    run.add_argument('--checkpoint', help="Checkpoint file, rewritten every --checkpoint-every steps.")
+    run.add_argument('--checkpoint-every', type=int, default=DEFAULTS['checkpoint_every'])
+    add_options(run)
+
+    resume = commands.add_parser('resume', help="Finish a run from its last checkpoint.")
+    resume.add_argument('checkpoint', help="Checkpoint file written by a previous run.")
+
+    sweep = commands.add_parser('sweep', help="Run every combination of initial conditions and timesteps.")
+    sweep.add_argument('initial', nargs='+', help="Initial condition files.")
+    sweep.add_argument('--dt', type=float, nargs='+', required=True)
+    sweep.add_argument('--output-dir', help="Directory for trajectory files.")
+    sweep.add_argument('--summary', help="Write the summary table to this CSV file.")
+    sweep.add_argument('--workers', type=int, default=None)
+    add_options(sweep)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'resume':
+        summary = pd.DataFrame([resume_run(args.checkpoint)])
+        print(summary.to_string(index=False))
+        return summary
+
+    options = {
+        'method': args.method,
+        'integrator': args.integrator,
+        'theta': args.theta,
+        'box_size': args.box_size,
+        'grid': args.grid,
+        'softening': args.softening,
+        'record_every': args.record_every,
+        'diagnostics_every': args.diagnostics_every,
+    }
+    if args.command == 'run':
+        summary = pd.DataFrame([run_config({'initial': args.initial, 'dt': args.dt,
+                                            'steps': args.steps, 'output': args.output,
+                                            'checkpoint': args.checkpoint,
+                                            'checkpoint_every': args.checkpoint_every,
+                                            **options})])
+    else:
+        if args.output_dir is not None:
+            Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+        configs = sweep_configs(args.initial, args.dt, args.steps,
+                                args.output_dir, **options)
+        summary = run_sweep(configs, args.workers)
+        if args.summary is not None:
+            summary.to_csv(args.summary, index=False)
+    print(summary.to_string(index=False))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
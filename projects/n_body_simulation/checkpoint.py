@@ -0,0 +1,50 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+"""
+Atomic checkpoint files. A checkpoint is an .npz archive of arrays plus a
+JSON string of metadata. It is written to a temporary file in the same
+directory, synced to disk and then renamed over the old checkpoint, so an
+interrupted write never leaves a half-written checkpoint behind. The
+directory is synced after the rename too, so the new name itself
+survives a crash.
+"""
+
+
+def write_checkpoint(path, arrays: dict, meta: dict) -> Path:
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'wb') as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    sync_directory(path.parent)
+    return path
+
+
+def sync_directory(directory) -> None:
+    # Windows cannot open a directory for fsync; NTFS journals the rename.
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def trajectory_path_for(path) -> Path:
+    """Where a checkpointed run keeps its frames when no trajectory file is given."""
+    path = Path(path)
+    return path.with_name(path.stem + ".trajectory.npy")
+
+
+def read_checkpoint(path) -> tuple[dict, dict]:
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files if key != 'meta'}
+        meta = json.loads(str(data['meta']))
+    return arrays, meta
@@ -0,0 +1,109 @@
+import numpy as np
+
+from .particles import BLOCK_PAIRS
+
+"""
+Conservation diagnostics for a ParticleSystem: kinetic, potential and
+total energy, linear momentum and angular momentum (the z component, since
+the motion is in the plane). Measurements are only taken every `every`
+steps, so monitoring a large system does not cost as much as stepping it.
+"""
+
+
+def kinetic_energy(vel, mass) -> float:
+    return float(0.5 * np.dot(mass, np.einsum('ij,ij->i', vel, vel)))
+
+
+def potential_energy(pos, mass, G, softening=0.0, block_size=None) -> float:
+    # Sum over pairs i < j, one block of rows at a time. Coincident pairs are
+    # skipped, as they are in the force kernel.
+    n = len(mass)
+    if n < 2:
+        return 0.0
+    if block_size is None:
+        block_size = max(1, BLOCK_PAIRS // n)
+    eps2 = softening ** 2
+    total = 0.0
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        r_vec = pos[None, start + 1:, :] - pos[start:stop, None, :]
+        r2 = np.einsum('ijk,ijk->ij', r_vec, r_vec)
+        upper = np.arange(start + 1, n)[None, :] > np.arange(start, stop)[:, None]
+        valid = upper & (r2 > 0)
+        inv_r = np.zeros_like(r2)
+        inv_r[valid] = (r2[valid] + eps2) ** -0.5
+        total -= G * np.dot(mass[start:stop], inv_r @ mass[start + 1:])
+    return float(total)
+
+
+def linear_momentum(vel, mass) -> np.ndarray:
+    return mass @ vel
+
+
+def angular_momentum(pos, vel, mass) -> float:
+    return float(np.dot(mass, pos[:, 0] * vel[:, 1] - pos[:, 1] * vel[:, 0]))
+
+
+def measure(system) -> dict:
+    kin = kinetic_energy(system.vel, system.mass)
+    pot = potential_energy(system.pos, system.mass, system.G,
+                           system.softening, system.block_size)
+    return {
+        'kinetic': kin,
+        'potential': pot,
+        'total': kin + pot,
+        'momentum': linear_momentum(system.vel, system.mass),
+        'angular_momentum': angular_momentum(system.pos, system.vel, system.mass),
+    }
+
+
+class Diagnostics:
+
+    def __init__(self, every: int = 1):
+        if every < 1:
+            raise ValueError("every must be a positive integer.")
+        self.every = every
+        self.steps = []
+        self.times = []
+        self.kinetic = []
+        self.potential = []
+        self.momentum = []
+        self.angular_momentum = []
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def record(self, step: int, time: float, system) -> dict | None:
+        if step % self.every:
+            return None
+        values = measure(system)
+        self.steps.append(step)
+        self.times.append(time)
+        self.kinetic.append(values['kinetic'])
+        self.potential.append(values['potential'])
+        self.momentum.append(values['momentum'])
+        self.angular_momentum.append(values['angular_momentum'])
+        return values
+
+    @property
+    def total(self) -> np.ndarray:
+        return np.array(self.kinetic) + np.array(self.potential)
+
+    def relative_energy_drift(self) -> np.ndarray:
+        """(E(t) - E(0)) / |E(0)| at every recorded step."""
+        total = self.total
+        if len(total) == 0:
+            return total
+        return (total - total[0]) / abs(total[0])
+
+    def summary(self) -> dict:
+        drift = self.relative_energy_drift()
+        momentum = np.array(self.momentum).reshape(-1, 2)
+        angular = np.array(self.angular_momentum)
+        return {
+            'samples': len(self),
+            'max_energy_drift': float(np.abs(drift).max()) if len(drift) else 0.0,
+            'final_energy_drift': float(drift[-1]) if len(drift) else 0.0,
+            'momentum_change': float(np.linalg.norm(momentum[-1] - momentum[0])) if len(momentum) else 0.0,
+            'angular_momentum_change': float(angular[-1] - angular[0]) if len(angular) else 0.0,
+        }
@@ -0,0 +1,85 @@
+import matplotlib.pyplot as plt
+import tkinter as tk
+from tkinter import messagebox
+import random
+
+from .main import Simulation, config_files, csv_to_listofdicts, initialise_many_bodies
+from .render import TrajectoryRenderer
+
+MAX_FRAMES = 2000
+
+
+class NBodyGUI:
+
+    def __init__(self, root):
+        self.root = root
+        self.root.title("N-Body Simulation Setup")
+
+        tk.Label(root, text="Timestep (dt): ").grid(row=0, column=0)
+        self.dt_entry = tk.Entry(root)
+        self.dt_entry.grid(row=0, column=1)
+
+        tk.Label(root, text="Number of steps: ").grid(row=1, column=0)
+        self.steps_entry = tk.Entry(root)
+        self.steps_entry.grid(row=1, column=1)
+
+        tk.Label(root, text="Initial Configuration: ").grid(row=3, column=0)
+        self.config_var = tk.StringVar(root)
+        self.config_var.set("Simple Solar System")
+        options = ["Random", "Simple Solar System", "Three Body Problem", "Binary System"]
+        self.dropdown = tk.OptionMenu(root, self.config_var, *options)
+        self.dropdown.grid(row=3, column=1)
+
+        run_button = tk.Button(root, text="Run Simulation", command=self.run_sim)
+        run_button.grid(row=4, column=0, columnspan=2, pady=10)
+
+    config_files = config_files
+
+    def run_sim(self):
+        try:
+            dt = float(self.dt_entry.get())
+            steps = int(self.steps_entry.get())
+            config = self.config_var.get()
+
+            if config == "Random":
+                filename = random.choice(list(NBodyGUI.config_files.values()))
+            else:
+                filename = NBodyGUI.config_files.get(config)
+            if not filename:
+                raise ValueError("Invalid configuration selected.")
+        except ValueError:
+            messagebox.showerror("Invalid input", "Please enter valid numbers.")
+            return
+
+        dummy = csv_to_listofdicts(filename)
+        list_of_bodies = initialise_many_bodies(dummy)
+        sim = Simulation(list_of_bodies)
+        sim.run(dt, steps, record_every=max(1, steps // MAX_FRAMES))
+
+        fig = plt.figure()
+        renderer = TrajectoryRenderer(sim.trajectory.recorded, sim.list_of_names())
+        self.animation = renderer.animation(fig)
+
+        plt.figure(figsize=(10, 6))
+        plt.plot(sim.time_history, sim.kin_energy_hist, label="Kinetic Energy", color="blue")
+        plt.plot(sim.time_history, sim.pot_energy_hist, label="Potential Energy", color="green")
+        plt.plot(sim.time_history, sim.total_energy_hist, label="Total Energy", color="red", linestyle= "--")
+        plt.ylabel("Energies")
+        plt.xlabel("Time")
+        plt.title("Energy vs Time")
+        plt.legend()
+        plt.grid(True)
+        plt.tight_layout()
+
+        plt.show()
+        print(sim.list_of_names())
+
+
+def launch():
+    root = tk.Tk()
+    NBodyGUI(root)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    launch()
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+from .particles import ParticleSystem
+
+"""
+Initial conditions for large systems. The generators build the position,
+velocity and mass arrays directly and return a ParticleSystem, and
+snapshots are stored as .npz files of the same arrays, so nothing here
+creates a Python object per body.
+
+Units follow the rest of the project: AU, years and solar masses, with
+G = 4 pi^2. Every generator returns the system in its centre of mass frame.
+"""
+
+G = ParticleSystem.G
+
+COLUMNS = ['x', 'y', 'vx', 'vy', 'mass', 'name']
+
+
+def to_centre_of_mass_frame(pos, vel, mass):
+    total = mass.sum()
+    pos -= mass @ pos / total
+    vel -= mass @ vel / total
+    return pos, vel
+
+
+def random_directions(rng, n):
+    # Uniform unit vectors in 3D.
+    cos_theta = rng.uniform(-1, 1, n)
+    phi = rng.uniform(0, 2 * np.pi, n)
+    sin_theta = np.sqrt(1 - cos_theta**2)
+    return np.stack([sin_theta * np.cos(phi), sin_theta * np.sin(phi), cos_theta], axis=1)
+
+
+def plummer_sphere(n: int, total_mass: float = 1.0, scale: float = 1.0,
+                   seed=None, **kwargs) -> ParticleSystem:
+    """
+    Equal-mass Plummer sphere sampled in 3D (Aarseth, Henon & Wielen 1974)
+    and projected onto the x-y plane.
+    """
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(1e-6, 1.0 - 1e-6, n)
+    r = scale / np.sqrt(x ** (-2 / 3) - 1)
+    pos = r[:, None] * random_directions(rng, n)
+
+    # Speeds as a fraction q of the escape speed, drawn from
+    # g(q) = q^2 (1 - q^2)^(7/2) by rejection, a batch at a time.
+    q = np.empty(0)
+    while len(q) < n:
+        trial = rng.uniform(0, 1, 2 * n)
+        accept = rng.uniform(0, 0.1, 2 * n) < trial**2 * (1 - trial**2) ** 3.5
+        q = np.concatenate([q, trial[accept]])
+    escape = np.sqrt(2 * G * total_mass) * (r**2 + scale**2) ** -0.25
+    vel = (q[:n] * escape)[:, None] * random_directions(rng, n)
+
+    mass = np.full(n, total_mass / n)
+    pos, vel = to_centre_of_mass_frame(pos[:, :2].copy(), vel[:, :2].copy(), mass)
+    return ParticleSystem(pos, vel, mass, **kwargs)
+
+
+def uniform_disk(n: int, radius: float = 1.0, total_mass: float = 1.0,
+                 velocity_dispersion: float = 0.0, seed=None,
+                 **kwargs) -> ParticleSystem:
+    """Equal-mass bodies spread uniformly over a disk, with Gaussian velocities."""
+    rng = np.random.default_rng(seed)
+    r = radius * np.sqrt(rng.uniform(0, 1, n))
+    phi = rng.uniform(0, 2 * np.pi, n)
+    pos = np.stack([r * np.cos(phi), r * np.sin(phi)], axis=1)
+    vel = rng.normal(0, velocity_dispersion, (n, 2)) if velocity_dispersion else np.zeros((n, 2))
+    mass = np.full(n, total_mass / n)
+    pos, vel = to_centre_of_mass_frame(pos, vel, mass)
+    return ParticleSystem(pos, vel, mass, **kwargs)
+
+
+def keplerian_disk(n: int, central_mass: float = 1.0, r_in: float = 0.5,
+                   r_out: float = 5.0, disk_mass: float = 1e-3,
+                   power: float = 1.0, seed=None, **kwargs) -> ParticleSystem:
+    """
+    A central body (row 0) with n bodies on circular orbits around it.
+    The disk surface density goes as r^-power between r_in and r_out, and
+    each orbital speed includes the disk mass inside that radius.
+    """
+    rng = np.random.default_rng(seed)
+    u = rng.uniform(0, 1, n)
+    if power == 2:
+        r = r_in * (r_out / r_in) ** u
+    else:
+        k = 2 - power
+        r = (r_in**k + u * (r_out**k - r_in**k)) ** (1 / k)
+    phi = rng.uniform(0, 2 * np.pi, n)
+
+    mass = np.full(n, disk_mass / n)
+    enclosed = central_mass + mass * np.argsort(np.argsort(r))
+    speed = np.sqrt(G * enclosed / r)
+    pos = np.vstack([[0.0, 0.0], np.stack([r * np.cos(phi), r * np.sin(phi)], axis=1)])
+    vel = np.vstack([[0.0, 0.0], np.stack([-speed * np.sin(phi), speed * np.cos(phi)], axis=1)])
+    mass = np.concatenate([[central_mass], mass])
+    pos, vel = to_centre_of_mass_frame(pos, vel, mass)
+    return ParticleSystem(pos, vel, mass, **kwargs)
+
+
+def random_binaries(n_binaries: int, box: float = 100.0, mass_range=(0.1, 1.0),
+                    separation_range=(0.01, 1.0), velocity_dispersion: float = 0.0,
+                    seed=None, **kwargs) -> ParticleSystem:
+    """
+    Circular binaries with log-uniform separations and random phases,
+    scattered uniformly over a square box. Rows 2k and 2k + 1 are the two
+    stars of binary k.
+    """
+    rng = np.random.default_rng(seed)
+    m1 = rng.uniform(*mass_range, n_binaries)
+    m2 = rng.uniform(*mass_range, n_binaries)
+    a = np.exp(rng.uniform(np.log(separation_range[0]), np.log(separation_range[1]), n_binaries))
+    phi = rng.uniform(0, 2 * np.pi, n_binaries)
+    direction = np.stack([np.cos(phi), np.sin(phi)], axis=1)
+    tangent = np.stack([-np.sin(phi), np.cos(phi)], axis=1)
+
+    total = m1 + m2
+    speed = np.sqrt(G * total / a)
+    centre = rng.uniform(-box / 2, box / 2, (n_binaries, 2))
+    drift = rng.normal(0, velocity_dispersion, (n_binaries, 2)) if velocity_dispersion else np.zeros((n_binaries, 2))
+
+    pos = np.empty((2 * n_binaries, 2))
+    vel = np.empty((2 * n_binaries, 2))
+    pos[0::2] = centre + (m2 / total * a)[:, None] * direction
+    pos[1::2] = centre - (m1 / total * a)[:, None] * direction
+    vel[0::2] = drift + (m2 / total * speed)[:, None] * tangent
+    vel[1::2] = drift - (m1 / total * speed)[:, None] * tangent
+    mass = np.empty(2 * n_binaries)
+    mass[0::2] = m1
+    mass[1::2] = m2
+    pos, vel = to_centre_of_mass_frame(pos, vel, mass)
+    return ParticleSystem(pos, vel, mass, **kwargs)
+
+
+def load_csv(path, **kwargs) -> ParticleSystem:
+    df = pd.read_csv(path, dtype={'name': str}, comment='#', header=None,
+                     names=COLUMNS)
+    return ParticleSystem(df[['x', 'y']].to_numpy(float),
+                          df[['vx', 'vy']].to_numpy(float),
+                          df['mass'].to_numpy(float),
+                          df['name'].fillna('').to_numpy(str), **kwargs)
+
+
+def save_snapshot(path, system: ParticleSystem) -> None:
+    np.savez(path, pos=system.pos, vel=system.vel, mass=system.mass,
+             names=system.names, softening=system.softening)
+
+
+def load_snapshot(path, **kwargs) -> ParticleSystem:
+    with np.load(path, allow_pickle=False) as data:
+        kwargs.setdefault('softening', float(data['softening']))
+        return ParticleSystem(data['pos'], data['vel'], data['mass'],
+                              data['names'], **kwargs)
@@ -0,0 +1,74 @@
+"""
+Symplectic integrators for a ParticleSystem.
+
+Each scheme is written as a sequence of kicks (v += c * dt * a) and drifts
+(x += c * dt * v). The accelerations are only recomputed when a kick needs
+them after the positions have moved, so the KDK leapfrog reuses the
+accelerations from the end of the previous step and costs exactly one
+force evaluation per step.
+"""
+
+# Coefficients of the 4th order triple-jump composition.
+W1 = 1 / (2 - 2 ** (1 / 3))
+W0 = 1 - 2 * W1
+
+
+class Integrator:
+
+    name = ""
+    order = 0
+    ops: tuple = ()
+
+    def step(self, system, dt, accelerate) -> int:
+        """
+        Advance the system by dt. `accelerate` refreshes system.acc from the
+        current positions. Returns the number of force evaluations made.
+        """
+        evaluations = 0
+        for op, coef in self.ops:
+            if op == "D":
+                system.drift(coef * dt)
+            else:
+                if not system.acc_current:
+                    accelerate()
+                    evaluations += 1
+                system.kick(coef * dt)
+        return evaluations
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class Leapfrog(Integrator):
+    # Kick-drift-kick, equivalent to velocity Verlet.
+    name = "leapfrog"
+    order = 2
+    ops = (("K", 0.5), ("D", 1.0), ("K", 0.5))
+
+
+class Yoshida4(Integrator):
+    # Three leapfrog steps of length W1, W0, W1 with the inner kicks merged.
+    name = "yoshida4"
+    order = 4
+    ops = (("K", W1 / 2), ("D", W1), ("K", (W1 + W0) / 2), ("D", W0),
+           ("K", (W0 + W1) / 2), ("D", W1), ("K", W1 / 2))
+
+
+class ForestRuth(Integrator):
+    # Position-first form of the same composition.
+    name = "forest_ruth"
+    order = 4
+    ops = (("D", W1 / 2), ("K", W1), ("D", (W1 + W0) / 2), ("K", W0),
+           ("D", (W0 + W1) / 2), ("K", W1), ("D", W1 / 2))
+
+
+INTEGRATORS = {cls.name: cls for cls in (Leapfrog, Yoshida4, ForestRuth)}
+
+
+def get_integrator(name) -> Integrator:
+    if isinstance(name, Integrator):
+        return name
+    try:
+        return INTEGRATORS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown integrator '{name}', expected one of {tuple(INTEGRATORS)}.") from None
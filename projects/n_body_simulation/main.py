@@ -1,12 +1,18 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 import pandas as pd
 import math
+from pathlib import Path
 from typing import List
-import tkinter as tk
-from tkinter import messagebox
-import random
+
+from .particles import ParticleSystem, direct_accelerations
+from .barnes_hut import barnes_hut_accelerations
+from .particle_mesh import ParticleMesh
+from .integrators import get_integrator
+from .trajectory import TrajectoryRecorder
+from .diagnostics import Diagnostics, kinetic_energy, potential_energy
+from .timestep import BlockTimesteps
+from .initial_conditions import load_csv, load_snapshot
+from .checkpoint import read_checkpoint, trajectory_path_for, write_checkpoint
 
 """
 Structure of dictionary to add bodies:
@@ -19,6 +25,14 @@ Structure of dictionary to add bodies:
 
 pi = math.pi
 
+DATA_DIR = Path(__file__).resolve().parent / "data_files"
+
+config_files = {
+    "Simple Solar System": DATA_DIR / "solar_system.csv",
+    "Three Body Problem": DATA_DIR / "three_body.csv",
+    "Binary System": DATA_DIR / "binary_system.csv",
+}
+
 
 def csv_to_listofdicts(path: str):
     df = pd.read_csv(f'{path}', dtype={'name': str}, comment='#',
@@ -26,31 +40,71 @@ def csv_to_listofdicts(path: str):
     return df.to_dict('records')
 
 
+def load_system(path, **kwargs) -> ParticleSystem:
+    if Path(path).suffix == ".npz":
+        return load_snapshot(path, **kwargs)
+    return load_csv(path, **kwargs)
+
+
 # --- Body Class ---
 class Bodies:
+    """
+    A single body, stored as a view onto one row of a ParticleSystem. A body
+    built straight from a dictionary gets a one-body system of its own.
+    """
+
+    G = ParticleSystem.G
+
+    def __init__(self, data: dict = None, system: ParticleSystem = None,
+                 index: int = 0) -> None:
+        if system is None:
+            system = ParticleSystem.from_dicts([data])
+            index = 0
+        self.system = system
+        self.index = index
+        self.name = str(system.names[index])
 
-    G = 4 * pi**2
+    @property
+    def identifier(self) -> int:
+        return self.index + 1
 
-    body_counter = 1
+    def __repr__(self) -> str:
+        x, y = self.pos
+        vx, vy = self.vel
+        return f"Body (x={x}, y={y}, vx={vx}, vy={vy}, mass={self.mass})"
 
-    _instances: List["Bodies"] = []
+    @property
+    def pos(self) -> np.ndarray:
+        return self.system.pos[self.index]
 
-    def __init__(self, data: dict) -> None:
-        self.pos = np.array([data['x'], data['y']], dtype=float)
-        self.vel = np.array([data['vx'], data['vy']], dtype=float)
-        self.name = str(data['name'])
-        self.force = np.zeros(2)
-        self.mass = data['mass']
-        self.identifier = Bodies.body_counter
-        Bodies.body_counter += 1
-        self.history = []
-        Bodies._instances.append(self)
+    @pos.setter
+    def pos(self, value) -> None:
+        self.system.pos[self.index] = value
+        self.system.acc_current = False
 
-    def __repr__(self) -> str:
-        return f"Body (x={self.x}, y={self.y}, vx={self.vx}, vy={self.vy}, mass={self.mass})"
+    @property
+    def vel(self) -> np.ndarray:
+        return self.system.vel[self.index]
+
+    @vel.setter
+    def vel(self, value) -> None:
+        self.system.vel[self.index] = value
+
+    @property
+    def mass(self) -> float:
+        return float(self.system.mass[self.index])
 
-    def all_instances(cls) -> List["Bodies"]:
-        return cls._instances
+    @mass.setter
+    def mass(self, value) -> None:
+        self.system.mass[self.index] = value
+
+    @property
+    def force(self) -> np.ndarray:
+        return self.mass * self.system.acc[self.index]
+
+    @force.setter
+    def force(self, value) -> None:
+        self.system.acc[self.index] = np.asarray(value) / self.mass
 
     def dist(self, other: "Bodies") -> tuple[float, np.ndarray]:
         dist = other.pos - self.pos
@@ -58,29 +112,27 @@ class Bodies:
         return r, dist
 
     def reset_force(self):
-        self.force = np.zeros(2)
+        self.system.acc[self.index] = 0.0
 
     def net_grav_force(self, others: List["Bodies"]) -> None:
-        self.reset_force()
-        for other in others:
-            if other is self:
-                continue
-            r_mag, r_vec = self.dist(other)
-            if r_mag == 0:
-                continue
-            r_hat = r_vec / r_mag
-            force_mag = Bodies.G * self.mass * other.mass / r_mag ** 2
-            self.force += force_mag * r_hat
+        others = [other for other in others if other is not self]
+        if not others:
+            self.reset_force()
+            return
+        pos = np.array([other.pos for other in others])
+        mass = np.array([other.mass for other in others])
+        self.system.acc[self.index] = direct_accelerations(
+            self.pos[None, :], pos, mass, Bodies.G, self.system.softening)[0]
 
     @property
-    def accel(self) -> float:
-        return self.force / self.mass
+    def accel(self) -> np.ndarray:
+        return self.system.acc[self.index]
 
     def verlet_pos_update(self, dt: float):
         self.pos += self.vel * dt + 0.5 * self.accel * dt**2
 
     def update(self, others: List["Bodies"], dt: float):
-        old_accel = self.accel
+        old_accel = self.accel.copy()
         self.verlet_pos_update(dt)
         self.net_grav_force(others)
         new_accel = self.accel
@@ -100,194 +152,292 @@ class Bodies:
             if r_mag == 0:
                 continue
             total += - Bodies.G * self.mass * other.mass / r_mag
-            return total
+        return total
+
+
+def shared_system(bodies: List["Bodies"]) -> ParticleSystem:
+    """
+    Return the ParticleSystem behind a list of bodies. If the bodies are not
+    exactly the rows of one system, their state is copied into a new system
+    and every body is re-pointed at its row in it.
+    """
+    system = bodies[0].system if bodies else None
+    if (system is not None and system.n == len(bodies)
+            and all(body.system is system and body.index == i
+                    for i, body in enumerate(bodies))):
+        return system
+
+    system = ParticleSystem([body.pos for body in bodies],
+                            [body.vel for body in bodies],
+                            [body.mass for body in bodies],
+                            [body.name for body in bodies])
+    for i, body in enumerate(bodies):
+        body.system = system
+        body.index = i
+    return system
 
 
 # --- Simulation Class ---
 class Simulation:
 
-    def __init__(self, bodies: List["Bodies"]):
-        self.bodies = bodies
+    force_methods = ("direct", "tree", "pm")
+
+    def __init__(self, bodies, method: str = "direct", theta: float = 0.5,
+                 leaf_size: int = 8, integrator="leapfrog",
+                 box_size: float = None, grid: int = 128):
+        if method not in Simulation.force_methods:
+            raise ValueError(f"Unknown force method '{method}', expected one of {Simulation.force_methods}.")
+        self.method = method
+        self.theta = theta
+        self.leaf_size = leaf_size
+        self.box_size = box_size
+        self.grid = grid
+        self.integrator = get_integrator(integrator)
+        self.force_evaluations = 0
+        self.step_count = 0
+        self.run_params = None
+        if isinstance(bodies, ParticleSystem):
+            self.system = bodies
+            self._bodies = None
+        else:
+            self._bodies = list(bodies)
+            self.system = shared_system(self._bodies)
+        self.mesh = None
+        if method == "pm":
+            if box_size is None:
+                raise ValueError("The particle-mesh method needs a box_size.")
+            self.mesh = ParticleMesh(box_size, grid, self.system.G,
+                                     self.system.softening)
         self.kin = 0
         self.pot = 0
         self.total = 0
 
     def list_of_names(self):
-        dummy_list = []
-        for body in self.bodies:
-            dummy_list.append(body.name)
-        return dummy_list
+        return [str(name) for name in self.system.names]
+
+    @property
+    def bodies(self) -> List["Bodies"]:
+        # Views are only created when asked for, so a large system loaded
+        # from arrays never gets one Python object per body.
+        if self._bodies is None:
+            self._bodies = [Bodies(system=self.system, index=i)
+                            for i in range(self.system.n)]
+        return self._bodies
+
+    def compute_accelerations(self) -> np.ndarray:
+        system = self.system
+        if self.method == "tree":
+            barnes_hut_accelerations(system.pos, system.mass, system.G,
+                                     self.theta, system.softening,
+                                     self.leaf_size, out=system.acc)
+            system.acc_current = True
+            return system.acc
+        if self.method == "pm":
+            # Periodic box: bodies leaving one side come back on the other.
+            system.pos[:] = self.mesh.wrap(system.pos)
+            self.mesh.accelerations(system.pos, system.mass, out=system.acc)
+            system.acc_current = True
+            return system.acc
+        return system.compute_accelerations()
 
     def total_kin_energy(self):
-        total = 0
-        for body in self.bodies:
-            total += body.kin_energy()
-        return total
+        return kinetic_energy(self.system.vel, self.system.mass)
 
     def total_pot_energy(self):
-        total = 0
-        for body in self.bodies:
-            total += body.pot_energy(self.bodies)
-        return total
+        system = self.system
+        return potential_energy(system.pos, system.mass, system.G,
+                                system.softening, system.block_size)
 
     def tot_energy(self):
         self.total = self.kin + self.pot
+        return self.total
 
     def step(self, dt):
-        for body in self.bodies:
-            body.net_grav_force(self.bodies) 
-
-        for body in self.bodies:
-            body.update(self.bodies, dt)
-
-        self.kin = self.total_kin_energy()
-        self.pot = self.total_pot_energy()
-        self.total = self.tot_energy()
-
-    def run(self, dt: float, steps: int):
-        self.kin_energy_hist = []
-        self.pot_energy_hist = []
-        self.total_energy_hist = []
-        self.time_history = []
-        self.kin = self.total_kin_energy()
-        self.pot = self.total_pot_energy()
-        self.total = self.tot_energy()
-        self.kin_energy_hist.append(self.kin)
-        self.pot_energy_hist.append(self.pot)
-        self.total_energy_hist.append(self.kin + self.pot)
-        self.time_history.append(0)
-
-        for step in range(1, steps + 1):
-            for body in self.bodies:
-                body.net_grav_force(self.bodies)
-            for body in self.bodies:
-                body.update(self.bodies, dt)
-                body.history.append(body.pos.copy())
-
-            self.kin = self.total_kin_energy()
-            self.pot = self.total_pot_energy()
-            self.total = abs(self.kin) + abs(self.pot)
-            self.kin_energy_hist.append(self.kin)
-            self.pot_energy_hist.append(self.pot)
-            self.total_energy_hist.append(self.total)
-            self.time_history.append(step * dt)
-
-
-def initialise_many_bodies(input: list) -> List:
-    body_list = []
-    for i in input:
-        body_list.append(Bodies(i))
-    return body_list
-
-
-class NBodyGUI:
+        self.force_evaluations += self.integrator.step(
+            self.system, dt, self.compute_accelerations)
+
+    def run(self, dt: float, steps: int, record_every: int = 1,
+            trajectory_path=None, diagnostics_every: int = 1,
+            checkpoint_path=None, checkpoint_every: int = 0):
+        if checkpoint_every and checkpoint_path is None:
+            raise ValueError("checkpoint_every needs a checkpoint_path to write to.")
+        if checkpoint_every and trajectory_path is None:
+            # Frames kept in memory would be copied into every checkpoint;
+            # on disk, a checkpoint only needs the frame count.
+            trajectory_path = trajectory_path_for(checkpoint_path)
+        self.run_params = {
+            'dt': dt,
+            'steps': steps,
+            'record_every': record_every,
+            'trajectory_path': None if trajectory_path is None else str(trajectory_path),
+            'diagnostics_every': diagnostics_every,
+            'checkpoint_path': None if checkpoint_path is None else str(checkpoint_path),
+            'checkpoint_every': checkpoint_every,
+        }
+        self.step_count = 0
+        self.trajectory = TrajectoryRecorder(self.system.n, steps, record_every,
+                                             trajectory_path)
+        self.diagnostics = Diagnostics(diagnostics_every)
+        self.record(0, 0.0)
+        self.continue_run()
+
+    def continue_run(self):
+        params = self.run_params
+        dt = params['dt']
+        every = params['checkpoint_every']
+        for step in range(self.step_count + 1, params['steps'] + 1):
+            self.step(dt)
+            self.step_count = step
+            self.record(step, step * dt)
+            if every and step % every == 0:
+                self.checkpoint(params['checkpoint_path'])
+        self.trajectory.close()
+
+    def checkpoint(self, path):
+        """
+        Save everything needed to carry on the current run() exactly where
+        it is: the arrays (including the accelerations the integrator will
+        reuse), the step counter, the run settings and the recorder offsets.
+        """
+        self.trajectory.flush()
+        system = self.system
+        diagnostics = self.diagnostics
+        arrays = {
+            'pos': system.pos,
+            'vel': system.vel,
+            'acc': system.acc,
+            'mass': system.mass,
+            'names': system.names,
+            'diag_steps': np.array(diagnostics.steps, dtype=np.int64),
+            'diag_times': np.array(diagnostics.times, dtype=float),
+            'diag_kinetic': np.array(diagnostics.kinetic, dtype=float),
+            'diag_potential': np.array(diagnostics.potential, dtype=float),
+            'diag_momentum': np.array(diagnostics.momentum, dtype=float).reshape(-1, 2),
+            'diag_angular_momentum': np.array(diagnostics.angular_momentum, dtype=float),
+        }
+        if self.trajectory.path is None:
+            arrays['trajectory'] = self.trajectory.recorded
+            arrays['trajectory_times'] = self.trajectory.recorded_times
+        meta = {
+            'softening': system.softening,
+            'block_size': system.block_size,
+            'acc_current': system.acc_current,
+            'method': self.method,
+            'theta': self.theta,
+            'leaf_size': self.leaf_size,
+            'box_size': self.box_size,
+            'grid': self.grid,
+            'integrator': self.integrator.name,
+            'force_evaluations': self.force_evaluations,
+            'step_count': self.step_count,
+            'run_params': self.run_params,
+            'trajectory_frames': self.trajectory.frames,
+        }
+        return write_checkpoint(path, arrays, meta)
+
+    @classmethod
+    def resume(cls, path) -> "Simulation":
+        """
+        Rebuild a simulation from a checkpoint. Calling continue_run() on it
+        finishes the interrupted run with the same results as if it had
+        never stopped.
+        """
+        arrays, meta = read_checkpoint(path)
+        system = ParticleSystem(arrays['pos'], arrays['vel'], arrays['mass'],
+                                arrays['names'], meta['softening'],
+                                meta['block_size'])
+        system.acc[:] = arrays['acc']
+        system.acc_current = meta['acc_current']
+        sim = cls(system, meta['method'], meta['theta'], meta['leaf_size'],
+                  meta['integrator'], meta['box_size'], meta['grid'])
+        sim.force_evaluations = meta['force_evaluations']
+        sim.step_count = meta['step_count']
+        sim.run_params = params = meta['run_params']
+
+        frames = meta['trajectory_frames']
+        if params['trajectory_path'] is None:
+            sim.trajectory = TrajectoryRecorder(system.n, params['steps'],
+                                                params['record_every'])
+            sim.trajectory.positions[:frames] = arrays['trajectory']
+            sim.trajectory.times[:frames] = arrays['trajectory_times']
+            sim.trajectory.frames = frames
+        else:
+            sim.trajectory = TrajectoryRecorder.reopen(
+                params['trajectory_path'], frames, params['record_every'])
+
+        diagnostics = Diagnostics(params['diagnostics_every'])
+        diagnostics.steps = [int(step) for step in arrays['diag_steps']]
+        diagnostics.times = [float(t) for t in arrays['diag_times']]
+        diagnostics.kinetic = [float(e) for e in arrays['diag_kinetic']]
+        diagnostics.potential = [float(e) for e in arrays['diag_potential']]
+        diagnostics.momentum = list(arrays['diag_momentum'])
+        diagnostics.angular_momentum = [float(L) for L in arrays['diag_angular_momentum']]
+        sim.diagnostics = diagnostics
+        if len(diagnostics):
+            sim.kin = diagnostics.kinetic[-1]
+            sim.pot = diagnostics.potential[-1]
+            sim.total = sim.kin + sim.pot
+        return sim
+
+    def run_adaptive(self, output_times, dt_max: float, eta: float = 0.02,
+                     max_level: int = 16, criterion: str = "jerk",
+                     trajectory_path=None):
+        """
+        Integrate with hierarchical block timesteps, stopping exactly at each
+        of the requested output times to record the trajectory and
+        diagnostics. Forces are summed directly.
+        """
+        output_times = np.sort(np.asarray(output_times, dtype=float))
+        self.timesteps = BlockTimesteps(dt_max, eta, max_level, criterion)
+        self.trajectory = TrajectoryRecorder(self.system.n, len(output_times),
+                                             1, trajectory_path)
+        self.diagnostics = Diagnostics(1)
+        self.record(0, 0.0)
+
+        time = 0.0
+        for step, t_out in enumerate(output_times, start=1):
+            before = self.timesteps.particle_evaluations
+            time = self.timesteps.run_until(self.system, time, t_out)
+            self.force_evaluations += (self.timesteps.particle_evaluations - before) / self.system.n
+            self.record(step, time)
+        self.trajectory.close()
+
+    def record(self, step: int, time: float):
+        self.trajectory.record(step, time, self.system.pos)
+        values = self.diagnostics.record(step, time, self.system)
+        if values is not None:
+            self.kin = values['kinetic']
+            self.pot = values['potential']
+            self.total = values['total']
 
-    def __init__(self, root):
-        self.root = root
-        self.root.title("N-Body Simulation Setup")
-
-        tk.Label(root, text="Timestep (dt): ").grid(row=0, column=0)
-        self.dt_entry = tk.Entry(root)
-        self.dt_entry.grid(row=0, column=1)
-
-        tk.Label(root, text="Number of steps: ").grid(row=1, column=0)
-        self.steps_entry = tk.Entry(root)
-        self.steps_entry.grid(row=1, column=1)
-
-        tk.Label(root, text="Initial Configuration: ").grid(row=3, column=0)
-        self.config_var = tk.StringVar(root)
-        self.config_var.set("Simple Solar System")
-        options = ["Random", "Simple Solar System", "Three Body Problem", "Binary System"]
-        self.dropdown = tk.OptionMenu(root, self.config_var, *options)
-        self.dropdown.grid(row=3, column=1)
-
-        run_button = tk.Button(root, text="Run Simulation", command=self.run_sim)
-        run_button.grid(row=4, column=0, columnspan=2, pady=10)
+    @property
+    def time_history(self):
+        return self.diagnostics.times
 
-    config_files = {
-        "Simple Solar System" : r"D:\computational_physics\projects\n_body_simulation\data_files\solar_system.csv",
-        "Three Body Problem": r"D:\computational_physics\projects\n_body_simulation\data_files\three_body.csv",
-        "Binary System": r"D:\computational_physics\projects\n_body_simulation\data_files\binary_system.csv"
-    }
+    @property
+    def kin_energy_hist(self):
+        return self.diagnostics.kinetic
 
-    def run_sim(self):
-        try:
-            dt = float(self.dt_entry.get())
-            steps = int(self.steps_entry.get())
-            config = self.config_var.get()
+    @property
+    def pot_energy_hist(self):
+        return self.diagnostics.potential
 
-            if config == "Random":
-                filename = random.choice(list(NBodyGUI.config_files.values()))
+    @property
+    def total_energy_hist(self):
+        return list(self.diagnostics.total)
 
-            filename = NBodyGUI.config_files.get(config)
-            if not filename:
-                raise ValueError("Invalid configuration selected.")
-        except ValueError:
-            messagebox.showerror("Invalid input", "Please enter valid numbers.")
-            return
 
-        dummy = csv_to_listofdicts(filename)
-        list_of_bodies = initialise_many_bodies(dummy)
-        sim = Simulation(list_of_bodies)
-        sim.run(dt, steps)
-
-        bodies_history = []
-        for body in list_of_bodies:
-            bodies_history.append(body.history)
-
-        fig, ax = plt.subplots()
-        ax.set_aspect('equal')
-        ax.set_xlim(-2, 2)
-        ax.set_ylim(-2, 2)
-
-        scatters = [ax.plot([], [], 'o')[0] for _ in list_of_bodies]
-        labels = [ax.text(0, 0, name, fontsize=8, ha='left', va='bottom') for
-                  name in sim.list_of_names()]
-        lines = [ax.plot([], [], lw=1)[0] for _ in list_of_bodies]
-
-        def init():
-            for scatter, line in zip(scatters, lines):
-                scatter.set_data([], [])
-                line.set_data([], [])
-            for label in labels:
-                label.set_position((0, 0))
-            return scatters + lines + labels
-
-        def update(frame):
-            print(f"Frame {frame}:")
-            for i, body in enumerate(list_of_bodies):
-                history = np.array(body.history)
-                lines[i].set_data(history[:frame+1, 0], history[:frame+1, 1])
-                x, y = history[frame]
-                print(f"Body {i} position: ({x}, {y})")
-                scatters[i].set_data([x], [y])
-                labels[i].set_position((x+0.05, y+0.05))
-            return scatters + lines + labels
-
-        ani = FuncAnimation(
-            fig, update, frames=len(list_of_bodies[0].history),
-            init_func=init, blit=False, interval=20
-        )
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(sim.time_history, sim.kin_energy_hist, label="Kinetic Energy", color="blue")
-        plt.plot(sim.time_history, sim.pot_energy_hist, label="Potential Energy", color="green")
-        plt.plot(sim.time_history, sim.total_energy_hist, label="Total Energy", color="red", linestyle= "--")
-        plt.ylabel = "Energies"
-        plt.xlabel = "Time"
-        plt.title = "Energy vs Time"
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
-
-        plt.show()
-        print(sim.list_of_names())
+def initialise_many_bodies(input: list) -> List:
+    system = ParticleSystem.from_dicts(input)
+    body_list = []
+    for i in range(system.n):
+        body_list.append(Bodies(system=system, index=i))
+    return body_list
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = NBodyGUI(root)
-    root.mainloop()
+    from .gui import launch
+    launch()
 
 # filename = r"D:\computational_physics\n_body_simulation\solar_system.csv"
 # dummy = csv_to_listofdicts(filename)
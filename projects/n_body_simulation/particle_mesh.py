@@ -0,0 +1,114 @@
+import numpy as np
+
+from .particles import ParticleSystem, direct_accelerations
+
+"""
+Particle-mesh gravity in a periodic square box [-L/2, L/2)^2.
+
+Masses are assigned to a grid with cloud-in-cell (CIC) weights, the
+potential is found with FFTs, the acceleration is the spectral gradient of
+the potential, and it is interpolated back to the bodies with the same CIC
+weights. The cost is O(N + M log M) for M grid cells.
+
+The bodies move in a plane but attract with the usual 1/r^2 law, so the
+Green's function is that of a thin sheet: the 2D Fourier transform of
+-G/r, which is -2 pi G / |k|, rather than the -4 pi G / k^2 of a 3D Poisson
+solve. With a Plummer softening of five cells or more, forces agree with
+direct summation to about a percent; structure below the softening scale
+is smoothed out by the mesh.
+"""
+
+
+class ParticleMesh:
+
+    def __init__(self, box_size: float, grid: int = 128, G: float = ParticleSystem.G,
+                 softening: float = 0.0, smoothing: float = None):
+        self.box_size = box_size
+        self.grid = grid
+        self.G = G
+        self.cell = box_size / grid
+        self.softening = softening
+        if smoothing is None:
+            smoothing = 1.0 if softening < 2 * self.cell else 0.0
+        self.smoothing = smoothing
+
+        k = 2 * np.pi * np.fft.fftfreq(grid, d=self.cell)
+        k_half = 2 * np.pi * np.fft.rfftfreq(grid, d=self.cell)
+        self.kx = k[:, None]
+        self.ky = k_half[None, :]
+        k_mag = np.sqrt(self.kx**2 + self.ky**2)
+        k_mag[0, 0] = 1.0
+        # Plummer softening of the thin-sheet kernel is exactly exp(-k eps).
+        # The kernel itself only falls off as 1/k, so when the softening is
+        # below a couple of cells the spectral gradient rings at the grid
+        # scale; by default a Gaussian of width one cell removes that.
+        self.greens = (-2 * np.pi * G / k_mag * np.exp(-k_mag * softening)
+                       * np.exp(-(k_mag * smoothing * self.cell) ** 2))
+        self.greens[0, 0] = 0.0
+
+    def wrap(self, pos) -> np.ndarray:
+        half = 0.5 * self.box_size
+        return np.mod(pos + half, self.box_size) - half
+
+    def cic_weights(self, pos):
+        u = (self.wrap(pos) + 0.5 * self.box_size) / self.cell - 0.5
+        lower = np.floor(u).astype(np.int64)
+        frac = u - lower
+        lower %= self.grid
+        upper = (lower + 1) % self.grid
+        corners = []
+        for ix, wx in ((lower[:, 0], 1 - frac[:, 0]), (upper[:, 0], frac[:, 0])):
+            for iy, wy in ((lower[:, 1], 1 - frac[:, 1]), (upper[:, 1], frac[:, 1])):
+                corners.append((ix * self.grid + iy, wx * wy))
+        return corners
+
+    def assign(self, corners, mass) -> np.ndarray:
+        grid = np.zeros(self.grid * self.grid)
+        for index, weight in corners:
+            grid += np.bincount(index, weights=mass * weight, minlength=grid.size)
+        return grid.reshape(self.grid, self.grid)
+
+    def interpolate(self, corners, field) -> np.ndarray:
+        flat = field.reshape(-1)
+        out = np.zeros(len(corners[0][0]))
+        for index, weight in corners:
+            out += weight * flat[index]
+        return out
+
+    def potential_and_field(self, mass_grid):
+        phi_k = self.greens * np.fft.rfft2(mass_grid)
+        area = self.cell**2
+        shape = mass_grid.shape
+        phi = np.fft.irfft2(phi_k, s=shape) / area
+        ax = np.fft.irfft2(-1j * self.kx * phi_k, s=shape) / area
+        ay = np.fft.irfft2(-1j * self.ky * phi_k, s=shape) / area
+        return phi, ax, ay
+
+    def accelerations(self, pos, mass, out=None) -> np.ndarray:
+        corners = self.cic_weights(pos)
+        _, ax, ay = self.potential_and_field(self.assign(corners, mass))
+        if out is None:
+            out = np.zeros((len(mass), 2))
+        out[:, 0] = self.interpolate(corners, ax)
+        out[:, 1] = self.interpolate(corners, ay)
+        return out
+
+
+def validate(system: ParticleSystem, box_size: float, grid: int = 256) -> dict:
+    """
+    Relative acceleration errors of the mesh against direct summation. The
+    system should be compact compared with the box, so that the periodic
+    images, which direct summation leaves out, are negligible.
+    """
+    mesh = ParticleMesh(box_size, grid, system.G, system.softening)
+    approx = mesh.accelerations(system.pos, system.mass)
+    exact = direct_accelerations(system.pos, system.pos, system.mass,
+                                 system.G, system.softening)
+    error = np.linalg.norm(approx - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    return {
+        'n': system.n,
+        'grid': grid,
+        'rms_error': float(np.sqrt(np.mean(error**2))),
+        'median_error': float(np.median(error)),
+        'max_error': float(error.max()),
+    }
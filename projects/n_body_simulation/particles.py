@@ -0,0 +1,100 @@
+import numpy as np
+import math
+
+"""
+Structure-of-arrays storage for the N-body problem. Every body is one row
+of the (N, 2) position/velocity/acceleration arrays and one entry of the
+(N,) mass array, so the whole system can be pushed through NumPy kernels
+in one go instead of looping over Python objects.
+"""
+
+pi = math.pi
+
+# Upper bound on the number of (target, source) pairs held in memory at once
+# by the direct summation kernel.
+BLOCK_PAIRS = 2**20
+
+
+def direct_accelerations(targets, pos, mass, G, softening=0.0,
+                         block_size=None, out=None):
+    """
+    Gravitational acceleration at each target point due to every source,
+    with Plummer softening. Pairs at zero separation are skipped, so a
+    target that is also a source does not feel itself. Targets are
+    processed in blocks so memory stays O(block_size * N).
+    """
+    targets = np.asarray(targets, dtype=float)
+    if out is None:
+        out = np.zeros_like(targets)
+    n_sources = len(pos)
+    if n_sources == 0 or len(targets) == 0:
+        out[:] = 0.0
+        return out
+    if block_size is None:
+        block_size = max(1, BLOCK_PAIRS // n_sources)
+    eps2 = softening ** 2
+
+    for start in range(0, len(targets), block_size):
+        stop = min(start + block_size, len(targets))
+        r_vec = pos[None, :, :] - targets[start:stop, None, :]
+        r2 = np.einsum('ijk,ijk->ij', r_vec, r_vec)
+        coincident = r2 == 0
+        r2 += eps2
+        r2[coincident] = 1.0
+        inv_r3 = r2 ** -1.5
+        inv_r3[coincident] = 0.0
+        out[start:stop] = G * np.einsum('ij,ijk->ik', mass * inv_r3, r_vec)
+    return out
+
+
+class ParticleSystem:
+
+    G = 4 * pi**2
+
+    def __init__(self, pos, vel, mass, names=None, softening=0.0,
+                 block_size=None) -> None:
+        self.pos = np.array(pos, dtype=float).reshape(-1, 2)
+        self.vel = np.array(vel, dtype=float).reshape(-1, 2)
+        self.mass = np.array(mass, dtype=float).reshape(-1)
+        self.acc = np.zeros_like(self.pos)
+        self.acc_current = False
+        if names is None:
+            names = np.arange(1, len(self.mass) + 1)
+        self.names = np.asarray(names).astype(str)
+        self.softening = softening
+        self.block_size = block_size
+
+        if not (len(self.pos) == len(self.vel) == len(self.mass)
+                == len(self.names)):
+            raise ValueError("pos, vel, mass and names must have the same length.")
+
+    def __len__(self) -> int:
+        return len(self.mass)
+
+    def __repr__(self) -> str:
+        return f"ParticleSystem (n={self.n}, softening={self.softening})"
+
+    @property
+    def n(self) -> int:
+        return len(self.mass)
+
+    @classmethod
+    def from_dicts(cls, data: list, **kwargs) -> "ParticleSystem":
+        pos = [[d['x'], d['y']] for d in data]
+        vel = [[d['vx'], d['vy']] for d in data]
+        mass = [d['mass'] for d in data]
+        names = [d.get('name', i + 1) for i, d in enumerate(data)]
+        return cls(pos, vel, mass, names, **kwargs)
+
+    def compute_accelerations(self) -> np.ndarray:
+        direct_accelerations(self.pos, self.pos, self.mass, self.G,
+                             self.softening, self.block_size, out=self.acc)
+        self.acc_current = True
+        return self.acc
+
+    def drift(self, dt: float) -> None:
+        self.pos += dt * self.vel
+        self.acc_current = False
+
+    def kick(self, dt: float) -> None:
+        self.vel += dt * self.acc
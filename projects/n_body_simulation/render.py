@@ -0,0 +1,141 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+from matplotlib import animation
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from .trajectory import load_trajectory
+
+"""
+Animation of a recorded trajectory. The (frames, N, 2) array is read
+once (it can be a memory map), every frame only touches the bodies'
+current positions and a fixed-length tail, and the artists are blitted, so
+the cost of a frame does not depend on how many frames came before it.
+
+Saving to a file uses a bare matplotlib Figure, so it works without a
+display:
+
+    python -m projects.n_body_simulation.render traj.npy orbit.mp4 --tail 200 --every 5
+"""
+
+MAX_LABELS = 20
+
+
+class TrajectoryRenderer:
+
+    def __init__(self, positions, names=None, tail: int = 100, every: int = 1,
+                 limits=None, interval: int = 20, marker_size: float = 12):
+        self.positions = positions[::every]
+        self.names = names if names is not None and len(names) <= MAX_LABELS else None
+        self.tail = tail
+        self.every = every
+        self.interval = interval
+        self.marker_size = marker_size
+        self.limits = limits if limits is not None else self.auto_limits()
+        self.fig = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def auto_limits(self, margin: float = 0.05):
+        lo = np.min(self.positions, axis=(0, 1))
+        hi = np.max(self.positions, axis=(0, 1))
+        half = 0.5 * max(float(np.max(hi - lo)), 1e-12) * (1 + margin)
+        centre = 0.5 * (lo + hi)
+        return (centre[0] - half, centre[0] + half), (centre[1] - half, centre[1] + half)
+
+    def setup(self, fig=None):
+        if fig is None:
+            fig = Figure(figsize=(6, 6))
+        self.fig = fig
+        ax = fig.add_subplot()
+        ax.set_aspect('equal')
+        ax.set_xlim(*self.limits[0])
+        ax.set_ylim(*self.limits[1])
+        n = self.positions.shape[1]
+        colours = [f"C{i % 10}" for i in range(n)]
+        self.tails = LineCollection([], linewidths=1, colors=colours)
+        ax.add_collection(self.tails)
+        self.points = ax.scatter(np.zeros(n), np.zeros(n), s=self.marker_size,
+                                 c=colours, zorder=3)
+        self.labels = []
+        if self.names is not None:
+            self.labels = [ax.text(0, 0, name, fontsize=8, ha='left', va='bottom')
+                           for name in self.names]
+        self.offset = 0.01 * (self.limits[0][1] - self.limits[0][0])
+        return fig
+
+    def artists(self):
+        return [self.tails, self.points] + self.labels
+
+    def draw_frame(self, frame: int):
+        current = self.positions[frame]
+        window = self.positions[max(0, frame - self.tail):frame + 1]
+        self.tails.set_segments(np.swapaxes(window, 0, 1))
+        self.points.set_offsets(current)
+        for label, (x, y) in zip(self.labels, current):
+            label.set_position((x + self.offset, y + self.offset))
+        return self.artists()
+
+    def init_frame(self):
+        return self.draw_frame(0)
+
+    def animation(self, fig=None) -> animation.FuncAnimation:
+        if self.fig is None or fig is not None:
+            self.setup(fig)
+        return animation.FuncAnimation(self.fig, self.draw_frame, frames=len(self),
+                                       init_func=self.init_frame, blit=True,
+                                       interval=self.interval)
+
+    def save(self, path, fps: int = 30, dpi: int = 100, writer=None) -> Path:
+        """
+        Render every frame to `path`. A path without a suffix is treated as
+        a directory and filled with a PNG image sequence, otherwise the
+        movie writer is chosen from the suffix and what is installed.
+        """
+        path = Path(path)
+        self.setup()
+        if path.suffix == "":
+            path.mkdir(parents=True, exist_ok=True)
+            for frame in range(len(self)):
+                self.draw_frame(frame)
+                self.fig.savefig(path / f"frame_{frame:06d}.png", dpi=dpi)
+            return path
+
+        if writer is None:
+            writer = pick_writer(path.suffix)
+        self.animation().save(path, writer=writer, fps=fps, dpi=dpi)
+        return path
+
+
+def pick_writer(suffix: str) -> str:
+    if suffix == ".gif":
+        candidates = ["pillow", "imagemagick"]
+    else:
+        candidates = ["ffmpeg", "avconv"]
+    for name in candidates:
+        if animation.writers.is_available(name):
+            return name
+    raise RuntimeError(f"No movie writer available for '{suffix}' files. "
+                       "Save as .gif or to a directory of PNG frames instead.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a recorded N-body trajectory.")
+    parser.add_argument('trajectory', help="Trajectory .npy file written by Simulation.run.")
+    parser.add_argument('output', help="Movie file (.mp4, .gif) or a directory for PNG frames.")
+    parser.add_argument('--tail', type=int, default=100)
+    parser.add_argument('--every', type=int, default=1)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    positions, _ = load_trajectory(args.trajectory)
+    renderer = TrajectoryRenderer(positions, tail=args.tail, every=args.every)
+    print(renderer.save(args.output, fps=args.fps, dpi=args.dpi))
+
+
+if __name__ == "__main__":
+    main()
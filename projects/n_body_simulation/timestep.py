@@ -0,0 +1,138 @@
+import numpy as np
+
+from .particles import BLOCK_PAIRS
+
+"""
+Adaptive, hierarchical (block) timesteps.
+
+Each body gets its own timestep from a local criterion, rounded down to a
+power-of-two fraction of the block length: dt_i = block / 2**level_i. Inside
+a block every body is integrated with KDK leapfrog on its own timestep.
+Only the bodies whose step ends at the current time ("active" bodies) have
+their forces recomputed; everyone else is just drifted, so a close binary
+no longer forces the whole system onto its timestep. Times are kept as
+integer ticks of block / 2**max_level, and all bodies are synchronised at
+the end of every block.
+
+Forces for the active bodies are summed directly over all bodies.
+"""
+
+CRITERIA = ("jerk", "acceleration")
+
+
+def accelerations_and_jerks(targets, pos, vel, mass, G, softening=0.0,
+                            block_size=None):
+    """
+    Acceleration and jerk (da/dt) of the bodies with indices `targets` due
+    to every body, skipping coincident pairs.
+    """
+    n = len(mass)
+    acc = np.zeros((len(targets), 2))
+    jerk = np.zeros((len(targets), 2))
+    if block_size is None:
+        block_size = max(1, BLOCK_PAIRS // max(n, 1))
+    eps2 = softening ** 2
+
+    for start in range(0, len(targets), block_size):
+        rows = targets[start:start + block_size]
+        r_vec = pos[None, :, :] - pos[rows, None, :]
+        v_vec = vel[None, :, :] - vel[rows, None, :]
+        r2 = np.einsum('ijk,ijk->ij', r_vec, r_vec)
+        rv = np.einsum('ijk,ijk->ij', r_vec, v_vec)
+        coincident = r2 == 0
+        r2 += eps2
+        r2[coincident] = 1.0
+        inv_r3 = r2 ** -1.5
+        inv_r3[coincident] = 0.0
+        weight = G * mass * inv_r3
+        acc[start:start + len(rows)] = np.einsum('ij,ijk->ik', weight, r_vec)
+        jerk[start:start + len(rows)] = (
+            np.einsum('ij,ijk->ik', weight, v_vec)
+            - np.einsum('ij,ijk->ik', 3 * weight * rv / r2, r_vec))
+    return acc, jerk
+
+
+class BlockTimesteps:
+
+    def __init__(self, dt_max: float, eta: float = 0.02, max_level: int = 16,
+                 criterion: str = "jerk", length_scale: float = None):
+        if criterion not in CRITERIA:
+            raise ValueError(f"Unknown timestep criterion '{criterion}', expected one of {CRITERIA}.")
+        self.dt_max = dt_max
+        self.eta = eta
+        self.max_level = max_level
+        self.criterion = criterion
+        self.length_scale = length_scale
+        self.particle_evaluations = 0
+        self.blocks = 0
+        self.substeps = 0
+        self.jerk = None
+
+    def timesteps(self, system) -> np.ndarray:
+        acc = np.linalg.norm(system.acc, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if self.criterion == "jerk":
+                dt = self.eta * acc / np.linalg.norm(self.jerk, axis=1)
+            else:
+                length = self.length_scale or system.softening
+                if not length:
+                    raise ValueError("The acceleration criterion needs a softening or length_scale.")
+                dt = self.eta * np.sqrt(length / acc)
+        return np.where(np.isfinite(dt), dt, np.inf)
+
+    def levels(self, dt, block: float) -> np.ndarray:
+        with np.errstate(divide='ignore'):
+            level = np.ceil(np.log2(block / dt))
+        return np.clip(level, 0, self.max_level).astype(np.int64)
+
+    def evaluate(self, system, targets) -> None:
+        acc, jerk = accelerations_and_jerks(targets, system.pos, system.vel,
+                                            system.mass, system.G,
+                                            system.softening, system.block_size)
+        system.acc[targets] = acc
+        self.jerk[targets] = jerk
+        self.particle_evaluations += len(targets)
+
+    def start(self, system) -> None:
+        self.jerk = np.zeros_like(system.pos)
+        self.evaluate(system, np.arange(system.n))
+        system.acc_current = True
+
+    def advance(self, system, block: float) -> None:
+        """Integrate every body over one block of length `block`."""
+        if self.jerk is None or len(self.jerk) != system.n or not system.acc_current:
+            self.start(system)
+        total = 2 ** self.max_level
+        h = block / total
+
+        ticks = total >> self.levels(self.timesteps(system), block)
+        last = np.zeros(system.n, dtype=np.int64)
+        system.vel += (0.5 * h * ticks)[:, None] * system.acc
+        now = 0
+        while now < total:
+            following = int(np.min(last + ticks))
+            system.pos += (following - now) * h * system.vel
+            now = following
+            active = np.flatnonzero(last + ticks == now)
+            self.evaluate(system, active)
+            system.vel[active] += (0.5 * h * ticks[active])[:, None] * system.acc[active]
+            last[active] = now
+            self.substeps += 1
+            if now < total:
+                # A body may only move to a longer step where that step's
+                # grid lines up with the current time.
+                new = total >> self.levels(self.timesteps(system)[active], block)
+                while np.any(now % new):
+                    new = np.where(now % new, new >> 1, new)
+                ticks[active] = new
+                system.vel[active] += (0.5 * h * new)[:, None] * system.acc[active]
+        system.acc_current = True
+        self.blocks += 1
+
+    def run_until(self, system, time: float, t_end: float) -> float:
+        """Advance from `time` to exactly `t_end` in blocks of at most dt_max."""
+        while t_end - time > 1e-12 * max(1.0, abs(t_end)):
+            block = min(self.dt_max, t_end - time)
+            self.advance(system, block)
+            time += block
+        return t_end
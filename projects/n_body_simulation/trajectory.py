@@ -0,0 +1,98 @@
+import numpy as np
+from pathlib import Path
+
+"""
+Trajectory storage for N-body runs. Frames are written into one
+preallocated (frames, N, 2) array, either in memory or as a memory-mapped
+.npy file on disk, so memory use does not grow with the number of steps.
+Only every `every`-th step is kept.
+"""
+
+
+def times_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.stem + ".times.npy")
+
+
+class TrajectoryRecorder:
+
+    def __init__(self, n_bodies: int, steps: int, every: int = 1, path=None,
+                 chunk_frames: int = 256):
+        if every < 1:
+            raise ValueError("every must be a positive integer.")
+        self.n_bodies = n_bodies
+        self.every = every
+        self.n_frames = steps // every + 1
+        self.path = None if path is None else Path(path)
+        self.chunk_frames = chunk_frames
+        self.frames = 0
+
+        shape = (self.n_frames, n_bodies, 2)
+        if self.path is None:
+            self.positions = np.empty(shape)
+            self.times = np.full(self.n_frames, np.nan)
+        else:
+            self.positions = np.lib.format.open_memmap(
+                self.path, mode='w+', dtype=float, shape=shape)
+            self.times = np.lib.format.open_memmap(
+                times_path(self.path), mode='w+', dtype=float,
+                shape=(self.n_frames,))
+            self.times[:] = np.nan
+
+    @classmethod
+    def reopen(cls, path, frames: int, every: int = 1,
+               chunk_frames: int = 256) -> "TrajectoryRecorder":
+        """
+        Continue writing an on-disk trajectory after its first `frames`
+        frames, e.g. when resuming from a checkpoint.
+        """
+        recorder = cls.__new__(cls)
+        recorder.path = Path(path)
+        recorder.positions = np.load(recorder.path, mmap_mode='r+')
+        recorder.times = np.load(times_path(recorder.path), mmap_mode='r+')
+        recorder.times[frames:] = np.nan
+        recorder.n_frames, recorder.n_bodies = recorder.positions.shape[:2]
+        recorder.every = every
+        recorder.chunk_frames = chunk_frames
+        recorder.frames = frames
+        return recorder
+
+    def __len__(self) -> int:
+        return self.frames
+
+    def record(self, step: int, time: float, pos: np.ndarray) -> bool:
+        if step % self.every or self.frames >= self.n_frames:
+            return False
+        self.positions[self.frames] = pos
+        self.times[self.frames] = time
+        self.frames += 1
+        if self.path is not None and self.frames % self.chunk_frames == 0:
+            self.flush()
+        return True
+
+    def flush(self) -> None:
+        if self.path is not None:
+            self.positions.flush()
+            self.times.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+    @property
+    def recorded(self) -> np.ndarray:
+        return self.positions[:self.frames]
+
+    @property
+    def recorded_times(self) -> np.ndarray:
+        return self.times[:self.frames]
+
+
+def load_trajectory(path):
+    """
+    Memory-map a trajectory written by TrajectoryRecorder. Returns the
+    positions and times of the frames that were actually written.
+    """
+    positions = np.load(path, mmap_mode='r')
+    times = np.load(times_path(path), mmap_mode='r')
+    frames = int(np.count_nonzero(~np.isnan(times)))
+    return positions[:frames], times[:frames]
@@ -1,12 +1,35 @@
 import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import eigsh
+
+from .symmetry import SymmetrySector
+
+"""
+H = -h sum_i X_i - J sum_i Z_i Z_(i+1) on an open chain of n spins, or a
+ring if periodic=True (the bond n-1, 0 is added).
+
+build() makes the dense 2^n x 2^n matrix from Kronecker products, which
+is fine up to n of about 12. build_sparse() writes the same matrix
+straight into CSR form from the bit patterns of the basis states: site i
+is bit n - 1 - i of the state index (site 0 is the first Kronecker
+factor), and Z_i = +1 when that bit is 0. Every row then holds the
+diagonal zz energy and the n states reached by flipping one bit with X_i,
+so the matrix takes (n + 1) 2^n entries and eigsh reaches n = 20 and more.
+
+build_sector() works in one symmetry sector (see symmetry.py):
+spin-flip parity, and momentum on a ring.
+"""
+
+DENSE_MAX = 12
 
 
 class Hamiltonian:
 
-    def __init__(self, num_particles, h, J):
+    def __init__(self, num_particles, h, J, periodic=False):
         self.n = num_particles
         self.h = h
         self.J = J
+        self.periodic = periodic
         self.sz = np.array([[1, 0], [0, -1]])
         self.sx = np.array([[0, 1], [1, 0]])
         self.identity = np.eye(2)
@@ -29,6 +52,12 @@ class Hamiltonian:
         product[target2] = self.sz
         return self.tensor_product(*product)
 
+    def bonds(self):
+        # On rings of one or two spins the closing bond would repeat a site
+        # or a bond, so it is only added from three spins up.
+        last = self.n if self.periodic and self.n > 2 else self.n - 1
+        return [(i, (i + 1) % self.n) for i in range(last)]
+
     def build(self):
         dim = 2 ** self.n
         H = np.zeros((dim, dim))
@@ -36,13 +65,89 @@ class Hamiltonian:
         for i in range(self.n):
             H -= self.h * self.flipping_term(i)
 
-        for i in range(self.n - 1):
-            H -= self.J * self.interaction_term(i, (i + 1) % self.n)
+        for i, j in self.bonds():
+            H -= self.J * self.interaction_term(i, j)
 
         return H
 
+    def zz_diagonal(self):
+        states = np.arange(2 ** self.n)
+        diagonal = np.zeros(len(states))
+        for i, j in self.bonds():
+            # The two bits differ exactly when Z_i Z_j = -1.
+            differ = ((states >> (self.n - 1 - i)) ^ (states >> (self.n - 1 - j))) & 1
+            diagonal -= self.J * (1 - 2 * differ)
+        return diagonal
 
-def find_eigenstates(n, h, J):
-    H = Hamiltonian(num_particles=n, h=h, J=J).build()
-    eigenvals, eigenvecs = np.linalg.eigh(H)
+    def build_sparse(self):
+        dim = 2 ** self.n
+        index_type = np.int32 if dim * (self.n + 1) < 2**31 else np.int64
+        states = np.arange(dim, dtype=index_type)
+        indices = np.empty((dim, self.n + 1), dtype=index_type)
+        data = np.empty((dim, self.n + 1))
+        for i in range(self.n):
+            indices[:, i] = states ^ (1 << (self.n - 1 - i))
+            data[:, i] = -self.h
+        indices[:, self.n] = states
+        data[:, self.n] = self.zz_diagonal()
+        indptr = np.arange(0, dim * (self.n + 1) + 1, self.n + 1, dtype=index_type)
+        return csr_matrix((data.reshape(-1), indices.reshape(-1), indptr), shape=(dim, dim))
+
+    def build_sector(self, parity=None, momentum=None):
+        """Sparse H in one symmetry sector, and the SymmetrySector basis."""
+        if momentum is not None and not self.periodic:
+            raise ValueError("Momentum is only conserved on a periodic chain.")
+        sector = SymmetrySector(self.n, parity, momentum)
+        return sector.hamiltonian(self.zz_diagonal(), self.h), sector
+
+
+def find_eigenstates(n, h, J, k=None, return_vectors=False, sparse=None):
+    """
+    Eigenvalues in ascending order (and eigenvectors as columns), the k
+    lowest if k is given. The sparse path, used by default above
+    DENSE_MAX spins, finds them with Lanczos (eigsh); the dense path
+    diagonalises the whole matrix with eigh, which it also falls back to
+    when k is too large for eigsh.
+    """
+    qh = Hamiltonian(num_particles=n, h=h, J=J)
+    if sparse is None:
+        sparse = n > DENSE_MAX
+    if sparse and k is not None and k < 2 ** n - 1:
+        eigenvals, eigenvecs = eigsh(qh.build_sparse(), k=k, which='SA')
+        order = np.argsort(eigenvals)
+        eigenvals, eigenvecs = eigenvals[order], eigenvecs[:, order]
+    else:
+        H = qh.build_sparse().toarray() if sparse else qh.build()
+        eigenvals, eigenvecs = np.linalg.eigh(H)
+        eigenvals, eigenvecs = eigenvals[:k], eigenvecs[:, :k]
+    if return_vectors:
+        return eigenvals, eigenvecs
     return eigenvals
+
+
+def ground_state(n, h, J):
+    """Ground state energy and state vector."""
+    eigenvals, eigenvecs = find_eigenstates(n, h, J, k=1, return_vectors=True)
+    return eigenvals[0], eigenvecs[:, 0]
+
+
+def find_sector_eigenstates(n, h, J, periodic=False, k=None):
+    """
+    Eigenvalues sector by sector, as {(parity, momentum): eigenvalues},
+    with momentum None on an open chain. With k, only the k lowest of each
+    sector are found, by Lanczos when the sector is large enough.
+    """
+    qh = Hamiltonian(num_particles=n, h=h, J=J, periodic=periodic)
+    momenta = range(n) if periodic else [None]
+    spectra = {}
+    for parity in (1, -1):
+        for momentum in momenta:
+            H, sector = qh.build_sector(parity, momentum)
+            if sector.dim == 0:
+                continue
+            if k is not None and k < sector.dim - 1 and sector.dim > 2 ** DENSE_MAX:
+                eigenvals = np.sort(eigsh(H, k=k, which='SA', return_eigenvectors=False))
+            else:
+                eigenvals = np.linalg.eigvalsh(H.toarray())[:k]
+            spectra[(parity, momentum)] = eigenvals
+    return spectra
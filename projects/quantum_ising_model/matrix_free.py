@@ -0,0 +1,51 @@
+import numpy as np
+from scipy.sparse.linalg import LinearOperator, eigsh
+
+from .main import Hamiltonian
+
+"""
+The transverse-field Ising Hamiltonian as a matrix-free LinearOperator.
+
+Only the zz diagonal (one number per basis state) is stored. X_i flips
+bit n - 1 - i of the basis index, so on a state vector reshaped to
+(2^i, 2, 2^(n-1-i)) it just swaps the two halves of the middle axis,
+which is a view. Applying H costs n + 1 vector operations and no more
+memory than a few state vectors, so n in the mid-20s fits on a laptop.
+The operator works on real or complex vectors and on blocks of vectors,
+so it can be passed to eigsh, expm_multiply and friends.
+"""
+
+
+class TransverseFieldOperator(LinearOperator):
+
+    def __init__(self, n, h, J, periodic=False):
+        self.n = n
+        self.h = h
+        self.J = J
+        self.diagonal = Hamiltonian(num_particles=n, h=h, J=J, periodic=periodic).zz_diagonal()
+        dim = 2 ** n
+        super().__init__(dtype=np.result_type(h, J, float), shape=(dim, dim))
+
+    def _matvec(self, v):
+        return self._matmat(v.reshape(-1, 1)).reshape(v.shape)
+
+    def _matmat(self, V):
+        out = self.diagonal[:, None] * V
+        if self.h:
+            flips = np.zeros(out.shape, dtype=out.dtype)
+            for i in range(self.n):
+                shape = (2 ** i, 2, 2 ** (self.n - 1 - i), V.shape[1])
+                flips.reshape(shape)[...] += V.reshape(shape)[:, ::-1]
+            out -= self.h * flips
+        return out
+
+    def _adjoint(self):
+        return self
+
+
+def lowest_eigenstates(n, h, J, k=1, v0=None, tol=0, periodic=False):
+    """The k lowest eigenvalues and eigenvectors, without storing H."""
+    eigenvals, eigenvecs = eigsh(TransverseFieldOperator(n, h, J, periodic=periodic), k=k,
+                                 which='SA', v0=v0, tol=tol)
+    order = np.argsort(eigenvals)
+    return eigenvals[order], eigenvecs[:, order]
@@ -0,0 +1,113 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+
+"""
+Symmetry sectors of the transverse-field Ising chain.
+
+H commutes with the global spin flip P = prod_i X_i, and on a periodic
+chain also with the translation T that moves every spin one site along.
+The group elements are g = T^m P^q, with characters
+chi(g) = exp(2 pi i k m / n) p^q for momentum k and parity p = +1 or -1.
+Each sector is spanned by one state per orbit of basis states under the
+group:
+
+    |r~> = orbit(r)^(-1/2) sum over s in the orbit of chi(g_s)^* |s>,
+
+where the representative r is the smallest index in the orbit and
+s = g_s r. A representative whose stabiliser has characters that sum to
+zero gives no state in that sector. Because H commutes with the group,
+
+    <b~|H|a~> = sum_j h_j chi(g_j) sqrt(orbit(a) / orbit(b)),
+
+summed over the terms h_j |s_j> of H|a> with s_j = g_j b. So each sector
+is built from its representatives alone, and its matrix is smaller than
+the full 2^n one by a factor of 2 (parity) or about 2n (parity and
+momentum).
+"""
+
+
+class SymmetrySector:
+
+    def __init__(self, n, parity=None, momentum=None):
+        self.n = n
+        self.parity = parity
+        self.momentum = momentum
+        self.mask = 2 ** n - 1
+        shifts = range(n) if momentum is not None else [0]
+        flips = (0, 1) if parity is not None else (0,)
+        self.elements = [(m, q) for m in shifts for q in flips]
+        is_complex = momentum is not None and (2 * momentum) % n != 0
+        self.dtype = complex if is_complex else float
+        characters = np.array([self.character(m, q) for m, q in self.elements])
+
+        # The representative of every basis state, and the character of the
+        # element taking the representative back to the state.
+        states = np.arange(2 ** n)
+        rep = states.copy()
+        best = np.zeros(len(states), dtype=np.int64)
+        for e, (m, q) in enumerate(self.elements):
+            image = self.apply(states, m, q)
+            smaller = image < rep
+            rep[smaller] = image[smaller]
+            best[smaller] = e
+        self.rep_of = rep
+        char_of = np.conj(characters[best])
+        self.char_of = char_of if is_complex else char_of.real
+
+        candidates = np.flatnonzero(rep == states)
+        stabiliser = np.zeros(len(candidates), dtype=np.int64)
+        character_sum = np.zeros(len(candidates), dtype=complex)
+        for (m, q), chi in zip(self.elements, characters):
+            fixed = self.apply(candidates, m, q) == candidates
+            stabiliser += fixed
+            character_sum += chi * fixed
+        keep = np.abs(character_sum) > 1e-8
+        self.states = candidates[keep]
+        self.orbit = len(self.elements) // stabiliser[keep]
+        self.index = np.full(2 ** n, -1, dtype=np.int64)
+        self.index[self.states] = np.arange(len(self.states))
+
+    @property
+    def dim(self) -> int:
+        return len(self.states)
+
+    def apply(self, states, m, q):
+        if q:
+            states = states ^ self.mask
+        if m:
+            states = ((states >> m) | (states << (self.n - m))) & self.mask
+        return states
+
+    def character(self, m, q):
+        chi = np.exp(2j * np.pi * self.momentum * m / self.n) if m else 1.0
+        return chi * (self.parity ** q if q else 1)
+
+    def hamiltonian(self, diagonal, h):
+        """
+        H in this sector, from the full-space zz diagonal (which is
+        invariant under the group) and the transverse field h.
+        """
+        a = np.arange(self.dim)
+        rows = [a]
+        cols = [a]
+        data = [diagonal[self.states].astype(self.dtype)]
+        for i in range(self.n):
+            flipped = self.states ^ (1 << (self.n - 1 - i))
+            b = self.index[self.rep_of[flipped]]
+            ok = b >= 0
+            rows.append(b[ok])
+            cols.append(a[ok])
+            data.append(-h * self.char_of[flipped[ok]]
+                        * np.sqrt(self.orbit[ok] / self.orbit[b[ok]]))
+        return coo_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                          shape=(self.dim, self.dim)).tocsr()
+
+    def expand(self, vector) -> np.ndarray:
+        """A sector state as a vector in the full 2^n basis."""
+        full = np.zeros(2 ** self.n, dtype=np.result_type(vector, self.char_of))
+        index = self.index[self.rep_of]
+        members = np.flatnonzero(index >= 0)
+        rows = index[members]
+        full[members] = (np.conj(self.char_of[members]) * vector[rows]
+                         / np.sqrt(self.orbit[rows]))
+        return full
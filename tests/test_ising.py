@@ -0,0 +1,224 @@
+import importlib
+
+import numpy as np
+import pytest
+
+ising = importlib.import_module("projects.2d_ising_model.main")
+scan = importlib.import_module("projects.2d_ising_model.scan")
+multispin = importlib.import_module("projects.2d_ising_model.multispin")
+observables = importlib.import_module("projects.2d_ising_model.observables")
+reweighting = importlib.import_module("projects.2d_ising_model.reweighting")
+
+
+def test_checkerboard_needs_even_lattice():
+    lattice = ising.IsingLattice(L=5, seed=0)
+    with pytest.raises(ValueError):
+        lattice.checkerboard_sweep(T=2.0)
+
+
+def test_checkerboard_energy_matches_exact_result():
+    # Onsager's internal energy per spin at T = 2 is -1.7455.
+    lattice = ising.IsingLattice(L=32, seed=1)
+    mag, energ = lattice.run(measure_sweeps=400, equil_sweeps=200, T=2.0,
+                             method="checkerboard")
+    _, energy = lattice.find_avgs((mag, energ))
+    assert abs(energy + 1.7455) < 0.03
+
+
+def test_checkerboard_orders_at_low_temperature():
+    lattice = ising.IsingLattice(L=16, seed=2)
+    lattice.lattice[:] = 1
+    lattice.recompute_totals()
+    for _ in range(50):
+        lattice.checkerboard_sweep(T=1.0)
+    assert lattice.measure_magnetisation() / 16**2 > 0.95
+
+
+@pytest.mark.parametrize("method", ["wolff", "swendsen_wang"])
+def test_cluster_updates_match_exact_energy(method):
+    lattice = ising.IsingLattice(L=32, seed=3)
+    mag, energ = lattice.run(measure_sweeps=300, equil_sweeps=100, T=2.0,
+                             method=method)
+    _, energy = lattice.find_avgs((mag, energ))
+    assert abs(energy + 1.7455) < 0.02
+
+
+def test_wolff_cluster_limits():
+    lattice = ising.IsingLattice(L=8, seed=4)
+    lattice.lattice[:] = 1
+    lattice.recompute_totals()
+    # At very low T every aligned bond is added, at very high T none are.
+    assert len(lattice.wolff_cluster(T=1e-3, seed_site=0)) == 64
+    assert np.all(lattice.lattice == -1)
+    assert len(lattice.wolff_cluster(T=1e3, seed_site=0)) == 1
+
+
+@pytest.mark.parametrize("h", [0.0, 0.3])
+@pytest.mark.parametrize("method", ["metropolis", "checkerboard", "wolff", "swendsen_wang"])
+def test_running_totals_match_recount(method, h):
+    lattice = ising.IsingLattice(L=12, seed=5, h=h)
+    for _ in range(20):
+        lattice.sweeps[method](T=2.3)
+    assert np.isclose(lattice.energy, lattice.compute_energy())
+    assert lattice.magnetisation == lattice.compute_magnetisation()
+
+
+def test_vectorised_energy_matches_neighbour_loop():
+    lattice = ising.IsingLattice(L=7, seed=6)
+    energy = 0
+    for i in range(7):
+        for j in range(7):
+            _, east, south, _ = lattice.find_neighbours((i, j))
+            energy -= lattice.lattice[i, j] * (lattice.lattice[east] + lattice.lattice[south])
+    assert lattice.compute_energy() == energy
+
+
+def test_temperature_scan_is_reproducible():
+    temperatures = [1.5, 2.5, 3.5]
+    first = scan.temperature_scan(8, temperatures, 20, 20, seed=7, max_workers=1)
+    second = scan.temperature_scan(8, temperatures, 20, 20, seed=7, max_workers=2)
+    assert first.equals(second)
+    assert first['magnetisation'].iloc[0] > first['magnetisation'].iloc[-1]
+
+
+def test_parallel_tempering():
+    results = scan.parallel_tempering(12, [3.0, 1.5, 2.0, 2.5], 100, 100, seed=8)
+    assert list(results['T']) == [1.5, 2.0, 2.5, 3.0]
+    assert results['magnetisation'].iloc[0] > 0.9
+    rates = results['swap_acceptance'].iloc[:-1]
+    assert np.all((rates > 0) & (rates <= 1))
+
+
+def test_multispin_packing_and_observables():
+    lattice = ising.IsingLattice(L=128, seed=9)
+    packed = multispin.MultiSpinLattice.from_spins(lattice.lattice)
+    assert packed.words.nbytes * 64 == lattice.lattice.nbytes
+    assert np.array_equal(packed.to_spins(), lattice.lattice)
+    assert packed.measure_energy() == lattice.compute_energy()
+    assert packed.measure_magnetisation() == abs(lattice.compute_magnetisation())
+    with pytest.raises(ValueError):
+        multispin.MultiSpinLattice(L=100)
+
+
+def test_multispin_random_mask_probability():
+    lattice = multispin.MultiSpinLattice(L=64, seed=10)
+    digits = multispin.probability_digits(0.3, 24)
+    mask = lattice.random_mask(digits, (2000,))
+    assert abs(multispin.popcount(mask) / (2000 * 64) - 0.3) < 0.005
+
+
+def test_multispin_energy_matches_exact_result():
+    lattice = multispin.MultiSpinLattice.from_spins(np.ones((64, 64), dtype=int), seed=11)
+    mag, energ = lattice.run(measure_sweeps=1000, equil_sweeps=100, T=2.0)
+    _, energy = lattice.find_avgs((mag, energ))
+    assert abs(energy + 1.7455) < 0.01
+
+
+def exact_averages(L, T, h):
+    # <E> and <|M|> per spin and the specific heat, by summing over all
+    # 2^(L^2) states.
+    states = np.arange(2 ** (L * L))[:, None] >> np.arange(L * L) & 1
+    spins = (2 * states - 1).reshape(-1, L, L)
+    magnetisation = spins.sum(axis=(1, 2))
+    energy = -np.sum(spins * (np.roll(spins, -1, axis=1) + np.roll(spins, -1, axis=2)),
+                     axis=(1, 2)) - h * magnetisation
+    weight = np.exp(-(energy - energy.min()) / T)
+    weight /= weight.sum()
+    mean_energy = weight @ energy
+    specific_heat = (weight @ energy**2 - mean_energy**2) / (L**2 * T**2)
+    return mean_energy / L**2, weight @ np.abs(magnetisation) / L**2, specific_heat
+
+
+def test_acceptance_table():
+    lattice = ising.IsingLattice(L=4, seed=12, h=0.5)
+    table = lattice.acceptance_table(T=2.0)
+    for spin in (-1, 1):
+        for neighbour_sum in (-4, -2, 0, 2, 4):
+            energy_change = 2 * spin * (neighbour_sum + 0.5)
+            expected = min(1.0, np.exp(-energy_change / 2.0))
+            assert np.isclose(table[(spin + 1) // 2, (neighbour_sum + 4) // 2], expected)
+
+    lattice.h = -0.5
+    assert np.allclose(lattice.acceptance_table(T=2.0), table[::-1, ::-1])
+
+
+@pytest.mark.parametrize("method", ["metropolis", "checkerboard", "wolff", "swendsen_wang"])
+def test_field_matches_exact_enumeration(method):
+    T, h = 2.5, 0.4
+    exact_energy, exact_mag, _ = exact_averages(4, T, h)
+    lattice = ising.IsingLattice(L=4, seed=13, h=h)
+    mag, energ = lattice.run(measure_sweeps=4000, equil_sweeps=100, T=T, method=method)
+    mag, energy = lattice.find_avgs((mag, energ))
+    assert abs(energy - exact_energy) < 0.03
+    assert abs(mag - exact_mag) < 0.03
+
+
+@pytest.mark.filterwarnings("error")
+def test_swendsen_wang_in_strong_field():
+    lattice = ising.IsingLattice(L=64, seed=15, h=-2.0)
+    lattice.swendsen_wang_sweep(0.5)
+    assert lattice.lattice.mean() < -0.99
+
+
+def test_binning_recovers_autocorrelation_time():
+    # An AR(1) series x_t = rho x_(t-1) + noise has tau_int = (1 + rho) / (2 (1 - rho)).
+    rng = np.random.default_rng(14)
+    rho = 0.8
+    acc = observables.Accumulator()
+    x = 0.0
+    for noise in rng.normal(size=2**16):
+        x = rho * x + noise
+        acc.add(x)
+    assert len(acc.sums) == 17
+    assert 64 <= acc.n_filled < 128
+    assert abs(acc.tau_int()[0] - 4.5) < 1.0
+    expected_error = np.sqrt(2 * 4.5 / (1 - rho**2) / 2**16)
+    assert abs(acc.error()[0] / expected_error - 1) < 0.25
+
+
+def test_sample_specific_heat_matches_exact_enumeration():
+    T = 2.5
+    exact_energy, _, exact_heat = exact_averages(4, T, 0.0)
+    lattice = ising.IsingLattice(L=4, seed=15)
+    results = lattice.sample(T=T, method="checkerboard", equil_sweeps=100, max_sweeps=20000)
+    assert abs(results['energy'] - exact_energy) < 4 * results['energy_err']
+    assert abs(results['specific_heat'] - exact_heat) < 4 * results['specific_heat_err']
+
+
+def test_sample_stops_at_target_error():
+    lattice = ising.IsingLattice(L=16, seed=16)
+    results = lattice.sample(T=4.0, method="checkerboard", equil_sweeps=100,
+                             max_sweeps=50000, target_error=0.003)
+    assert results['sweeps'] < 50000
+    assert results['energy_err'] < 0.003 and results['magnetisation_err'] < 0.003
+
+
+def test_multiple_histogram_matches_exact_enumeration():
+    temperatures = [2.0, 2.5, 3.0]
+    runs = reweighting.record_runs(4, temperatures, 4000, 200, seed=17, max_workers=1)
+    histogram = reweighting.MultipleHistogram(*runs, n_spins=16)
+
+    states = np.arange(2**16)[:, None] >> np.arange(16) & 1
+    spins = (2 * states - 1).reshape(-1, 4, 4)
+    energy = -np.sum(spins * (np.roll(spins, -1, axis=1) + np.roll(spins, -1, axis=2)), axis=(1, 2))
+    log_z = np.array([np.log(np.sum(np.exp(-(energy - histogram.offset) / T)))
+                      for T in temperatures])
+    assert np.allclose(histogram.log_z, log_z - log_z[0], atol=0.05)
+
+    curves = histogram.curves([2.25, 2.75])
+    for T, row in zip([2.25, 2.75], curves.itertuples()):
+        exact_energy, exact_mag, exact_heat = exact_averages(4, T, 0.0)
+        assert abs(row.energy - exact_energy) < 4 * row.energy_err
+        assert abs(row.magnetisation - exact_mag) < 4 * row.magnetisation_err
+        assert abs(row.specific_heat - exact_heat) < 4 * row.specific_heat_err
+
+
+def test_single_histogram_reweighting():
+    runs = reweighting.record_runs(4, [2.5], 4000, 200, seed=18, max_workers=1)
+    histogram = reweighting.MultipleHistogram(*runs, n_spins=16)
+    curves = histogram.curves([2.4, 2.6])
+    for T, row in zip([2.4, 2.6], curves.itertuples()):
+        exact_energy, _, _ = exact_averages(4, T, 0.0)
+        assert abs(row.energy - exact_energy) < 4 * row.energy_err
+    T_peak, height = histogram.peak('specific_heat', (2.0, 3.0))
+    assert 2.0 < T_peak < 3.0 and height >= curves['specific_heat'].max()
@@ -0,0 +1,294 @@
+import numpy as np
+import pytest
+from projects.n_body_simulation.main import Bodies, Simulation, csv_to_listofdicts, initialise_many_bodies
+from projects.n_body_simulation.barnes_hut import QuadTree
+from projects.n_body_simulation.diagnostics import potential_energy
+from projects.n_body_simulation.particles import ParticleSystem, direct_accelerations
+from projects.n_body_simulation.trajectory import load_trajectory
+
+
+def random_system(n, seed=0, **kwargs):
+    rng = np.random.default_rng(seed)
+    return ParticleSystem(rng.normal(size=(n, 2)), rng.normal(size=(n, 2)),
+                          rng.uniform(0.1, 1.0, n), **kwargs)
+
+
+def test_direct_kernel_matches_pairwise_loop():
+    system = random_system(20)
+    acc = system.compute_accelerations()
+    expected = np.zeros((20, 2))
+    for i in range(20):
+        for j in range(20):
+            if i != j:
+                r = system.pos[j] - system.pos[i]
+                expected[i] += system.G * system.mass[j] * r / np.linalg.norm(r)**3
+    assert np.allclose(acc, expected)
+
+    blocked = direct_accelerations(system.pos, system.pos, system.mass,
+                                   system.G, block_size=3)
+    assert np.allclose(blocked, expected)
+
+
+def test_bodies_are_views_of_system_rows():
+    data = [{'x': 1.0, 'y': 0.0, 'vx': 0.0, 'vy': 2 * np.pi, 'mass': 3e-6, 'name': 'Earth'},
+            {'x': 0.0, 'y': 0.0, 'vx': 0.0, 'vy': 0.0, 'mass': 1.0, 'name': 'Sun'}]
+    earth, sun = initialise_many_bodies(data)
+    assert earth.system is sun.system
+    earth.pos += 1.0
+    assert np.allclose(earth.system.pos[0], [2.0, 1.0])
+
+    sim = Simulation([earth, sun])
+    assert sim.system is earth.system
+    assert sim.list_of_names() == ['Earth', 'Sun']
+
+
+def test_simulation_collects_loose_bodies_into_one_system():
+    a = Bodies({'x': 1.0, 'y': 0.0, 'vx': 0.0, 'vy': 2 * np.pi, 'mass': 3e-6, 'name': 'a'})
+    b = Bodies({'x': 0.0, 'y': 0.0, 'vx': 0.0, 'vy': 0.0, 'mass': 1.0, 'name': 'b'})
+    sim = Simulation([a, b])
+    assert a.system is b.system is sim.system
+    sim.run(0.001, 1000)
+    assert np.allclose(np.linalg.norm(a.pos - b.pos), 1.0, atol=1e-3)
+
+
+def test_barnes_hut_matches_direct_summation():
+    system = random_system(300, seed=1)
+    exact = system.compute_accelerations().copy()
+    tree = QuadTree(system.pos, system.mass, leaf_size=4)
+    assert np.isclose(tree.node_mass[0], system.mass.sum())
+    assert np.allclose(tree.accelerations(system.G, theta=0.0), exact)
+
+    approx = tree.accelerations(system.G, theta=0.3)
+    error = np.linalg.norm(approx - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    assert np.sqrt(np.mean(error**2)) < 0.02
+
+
+def test_simulation_tree_mode():
+    direct = Simulation(random_system(50, seed=2))
+    tree = Simulation(random_system(50, seed=2), method="tree", theta=0.0)
+    direct.run(1e-4, 5)
+    tree.run(1e-4, 5)
+    assert np.allclose(direct.system.pos, tree.system.pos)
+
+
+def eccentric_orbit():
+    G = ParticleSystem.G
+    e = 0.5
+    speed = np.sqrt(G * 1.001 * (1 + e) / (1 - e))
+    return ParticleSystem([[0.0, 0.0], [1 - e, 0.0]], [[0.0, 0.0], [0.0, speed]],
+                          [1.0, 1e-3])
+
+
+def test_leapfrog_uses_one_force_evaluation_per_step():
+    sim = Simulation(eccentric_orbit(), integrator="leapfrog")
+    for _ in range(100):
+        sim.step(0.01)
+    assert sim.force_evaluations == 101
+
+
+def test_fourth_order_integrators_converge_at_fourth_order():
+    reference = Simulation(eccentric_orbit(), integrator="yoshida4")
+    for _ in range(800):
+        reference.step(0.5 / 800)
+
+    for name in ("yoshida4", "forest_ruth"):
+        errors = []
+        for steps in (50, 100):
+            sim = Simulation(eccentric_orbit(), integrator=name)
+            for _ in range(steps):
+                sim.step(0.5 / steps)
+            errors.append(np.abs(sim.system.pos - reference.system.pos).max())
+        assert errors[0] / errors[1] > 10
+
+
+def test_trajectory_on_disk_matches_in_memory(tmp_path):
+    in_memory = Simulation(random_system(10, seed=3))
+    in_memory.run(1e-3, 20, record_every=5)
+    assert in_memory.trajectory.recorded.shape == (5, 10, 2)
+    assert np.allclose(in_memory.trajectory.recorded_times, [0.0, 0.005, 0.01, 0.015, 0.02])
+
+    path = tmp_path / "trajectory.npy"
+    on_disk = Simulation(random_system(10, seed=3))
+    on_disk.run(1e-3, 20, record_every=5, trajectory_path=path)
+    positions, times = load_trajectory(path)
+    assert isinstance(positions, np.memmap)
+    assert np.array_equal(positions, in_memory.trajectory.recorded)
+    assert np.allclose(positions[-1], on_disk.system.pos)
+
+
+def test_potential_energy_matches_pairwise_sum():
+    system = random_system(15, seed=4)
+    bodies = Simulation(system).bodies
+    pairwise = 0.5 * sum(body.pot_energy(bodies) for body in bodies)
+    assert np.isclose(potential_energy(system.pos, system.mass, system.G, block_size=4), pairwise)
+
+
+def test_diagnostics_cadence_and_conservation():
+    sim = Simulation(eccentric_orbit())
+    sim.run(1e-3, 1000, diagnostics_every=100)
+    assert sim.diagnostics.steps == list(range(0, 1001, 100))
+    summary = sim.diagnostics.summary()
+    assert summary['max_energy_drift'] < 1e-3
+    assert summary['momentum_change'] < 1e-12
+    assert abs(summary['angular_momentum_change']) < 1e-10
+
+
+def binary_with_planets(n=20, seed=0):
+    rng = np.random.default_rng(seed)
+    G = ParticleSystem.G
+    v = np.sqrt(G / 0.02) / 2
+    r = rng.uniform(2, 10, n)
+    phi = rng.uniform(0, 2 * np.pi, n)
+    v_circ = np.sqrt(G / r)
+    pos = np.vstack([[[-0.01, 0.0], [0.01, 0.0]], np.c_[r * np.cos(phi), r * np.sin(phi)]])
+    vel = np.vstack([[[0.0, -v], [0.0, v]], np.c_[-v_circ * np.sin(phi), v_circ * np.cos(phi)]])
+    return ParticleSystem(pos, vel, np.r_[0.5, 0.5, np.full(n, 1e-6)])
+
+
+def test_block_timesteps_resolve_binary_with_fewer_force_evaluations():
+    output_times = [0.025, 0.05, 0.1]
+    adaptive = Simulation(binary_with_planets())
+    adaptive.run_adaptive(output_times, dt_max=0.025, eta=0.05)
+    assert np.allclose(adaptive.diagnostics.times, [0.0] + output_times)
+    assert adaptive.diagnostics.summary()['max_energy_drift'] < 1e-5
+
+    fixed = Simulation(binary_with_planets())
+    fixed.run(2e-5, 5000, diagnostics_every=5000)
+    assert adaptive.force_evaluations < 0.2 * fixed.force_evaluations
+    assert np.allclose(adaptive.system.pos[2:], fixed.system.pos[2:], atol=1e-3)
+
+
+def test_batch_runner_is_headless():
+    import subprocess
+    import sys
+    code = ("import sys, projects.n_body_simulation.batch; "
+            "assert 'tkinter' not in sys.modules and 'matplotlib' not in sys.modules")
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_parameter_sweep_runs_in_worker_processes(tmp_path):
+    from projects.n_body_simulation.batch import run_config, run_sweep, sweep_configs
+    from projects.n_body_simulation.main import config_files
+
+    initials = [config_files["Binary System"], config_files["Three Body Problem"]]
+    configs = sweep_configs(initials, [0.01, 0.005], 200, tmp_path, diagnostics_every=50)
+    summary = run_sweep(configs, max_workers=2)
+    assert len(summary) == 4
+    assert list(summary['n']) == [2, 2, 3, 3]
+    assert (summary['max_energy_drift'] < 1e-3).all()
+    positions, _ = load_trajectory(summary['output'][0])
+    assert positions.shape == (201, 2, 2)
+    assert (summary['frames'] == 201).all()
+
+    # Without an output file only the first and last frames are kept.
+    headless = run_config({'initial': initials[0], 'dt': 0.01, 'steps': 200})
+    assert headless['frames'] == 2
+
+
+def test_renderer_writes_frames_without_a_display(tmp_path):
+    from projects.n_body_simulation.render import TrajectoryRenderer
+
+    sim = Simulation(eccentric_orbit())
+    sim.run(1e-3, 100, record_every=10)
+    renderer = TrajectoryRenderer(sim.trajectory.recorded, sim.list_of_names(), tail=3, every=2)
+    assert len(renderer) == 6
+
+    frames = renderer.save(tmp_path / "frames")
+    assert len(list(frames.glob("frame_*.png"))) == 6
+    assert renderer.save(tmp_path / "orbit.gif", fps=5).stat().st_size > 0
+    assert len(renderer.fig.axes) == 1
+    assert len(renderer.tails.get_segments()[0]) == 4
+
+
+def test_generators_and_snapshots(tmp_path):
+    from projects.n_body_simulation import initial_conditions as ic
+    from projects.n_body_simulation.main import load_system
+
+    for system in (ic.plummer_sphere(500, seed=1), ic.uniform_disk(500, seed=1),
+                   ic.keplerian_disk(500, seed=1), ic.random_binaries(250, seed=1)):
+        assert system.n in (500, 501)
+        assert np.allclose(system.mass @ system.vel, 0.0, atol=1e-12)
+
+    binaries = ic.random_binaries(10, seed=2)
+    separation = np.linalg.norm(binaries.pos[0::2] - binaries.pos[1::2], axis=1)
+    assert np.all((separation >= 0.01) & (separation <= 1.0))
+
+    system = ic.plummer_sphere(100, seed=3, softening=0.01)
+    ic.save_snapshot(tmp_path / "plummer.npz", system)
+    loaded = load_system(tmp_path / "plummer.npz")
+    assert np.array_equal(loaded.pos, system.pos)
+    assert np.array_equal(loaded.names, system.names)
+    assert loaded.softening == 0.01
+
+
+def test_csv_loader_matches_dictionary_path():
+    from projects.n_body_simulation.main import config_files, load_system
+    path = config_files["Simple Solar System"]
+    system = load_system(path)
+    bodies = initialise_many_bodies(csv_to_listofdicts(path))
+    assert np.array_equal(system.pos, bodies[0].system.pos)
+    assert list(system.names) == [body.name for body in bodies]
+
+
+def test_particle_mesh_matches_direct_summation_for_compact_system():
+    from projects.n_body_simulation.particle_mesh import ParticleMesh, validate
+
+    rng = np.random.default_rng(5)
+    system = ParticleSystem(rng.normal(0, 0.05, (100, 2)), np.zeros((100, 2)),
+                            np.full(100, 0.01), softening=5 / 256)
+    report = validate(system, box_size=1.0, grid=256)
+    assert report['median_error'] < 0.02
+    assert report['rms_error'] < 0.05
+
+    mesh = ParticleMesh(1.0, 64)
+    assert np.allclose(mesh.wrap(np.array([[0.7, -0.6]])), [[-0.3, 0.4]])
+
+
+def test_simulation_particle_mesh_mode_wraps_into_box():
+    system = ParticleSystem([[0.45, 0.0], [-0.45, 0.0]], [[1.0, 0.0], [-1.0, 0.0]],
+                            [1e-6, 1e-6], softening=0.05)
+    sim = Simulation(system, method="pm", box_size=1.0, grid=32)
+    sim.run(0.01, 10)
+    assert np.all(np.abs(sim.system.pos) <= 0.5)
+
+
+def test_resume_from_checkpoint_is_bit_for_bit(tmp_path):
+    reference = Simulation(random_system(12, seed=6), integrator="yoshida4")
+    reference.run(1e-3, 100, record_every=10, diagnostics_every=20)
+
+    checkpoint = tmp_path / "run.ckpt.npz"
+    trajectory = tmp_path / "run.npy"
+    interrupted = Simulation(random_system(12, seed=6), integrator="yoshida4")
+    interrupted.run(1e-3, 100, record_every=10, trajectory_path=trajectory,
+                    diagnostics_every=20, checkpoint_path=checkpoint, checkpoint_every=30)
+
+    resumed = Simulation.resume(checkpoint)
+    assert resumed.step_count == 90
+    resumed.continue_run()
+    assert np.array_equal(resumed.system.pos, reference.system.pos)
+    assert np.array_equal(resumed.system.vel, reference.system.vel)
+    assert resumed.force_evaluations == reference.force_evaluations
+    assert resumed.diagnostics.steps == reference.diagnostics.steps
+    assert np.array_equal(resumed.diagnostics.total, reference.diagnostics.total)
+    positions, _ = load_trajectory(trajectory)
+    assert np.array_equal(positions, reference.trajectory.recorded)
+    assert not (tmp_path / "run.ckpt.npz.tmp").exists()
+
+    with pytest.raises(ValueError):
+        Simulation(random_system(3, seed=6)).run(1e-3, 10, checkpoint_every=5)
+
+
+def test_checkpoints_keep_frames_on_disk(tmp_path):
+    reference = Simulation(random_system(12, seed=6))
+    reference.run(1e-3, 100, record_every=10)
+
+    checkpoint = tmp_path / "run.ckpt.npz"
+    interrupted = Simulation(random_system(12, seed=6))
+    interrupted.run(1e-3, 100, record_every=10, checkpoint_path=checkpoint, checkpoint_every=30)
+    with np.load(checkpoint) as data:
+        assert 'trajectory' not in data.files
+
+    resumed = Simulation.resume(checkpoint)
+    resumed.continue_run()
+    assert resumed.trajectory.path == tmp_path / "run.ckpt.trajectory.npy"
+    assert np.array_equal(resumed.trajectory.recorded, reference.trajectory.recorded)
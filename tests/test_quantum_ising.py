@@ -1,8 +1,180 @@
 import numpy as np
-from projects.quantum_ising_model.main import Hamiltonian
+import pytest
+from projects.quantum_ising_model.main import (Hamiltonian, find_eigenstates, find_sector_eigenstates,
+                                               ground_state)
+from projects.quantum_ising_model.dynamics import entanglement_entropy, evolve, product_state, quench
+from projects.quantum_ising_model.sweep import operator_terms, parameter_sweep
+from projects.quantum_ising_model.matrix_free import TransverseFieldOperator, lowest_eigenstates
+from projects.quantum_ising_model.dmrg import DMRG, X
 
 
 def test_is_hermitian():
     qh = Hamiltonian(num_particles=3, h=1.0, J=0.5)
     H = qh.build()
     assert np.allclose(H, H.conj().T), "Hamiltonian is not Hermitian"
+
+
+@pytest.mark.parametrize("n", [1, 2, 5, 8])
+def test_sparse_matches_dense(n):
+    qh = Hamiltonian(num_particles=n, h=0.7, J=1.3)
+    assert np.allclose(qh.build_sparse().toarray(), qh.build())
+
+
+def test_lanczos_matches_dense_spectrum():
+    dense = find_eigenstates(8, h=0.6, J=1.0)
+    lowest, vectors = find_eigenstates(8, h=0.6, J=1.0, k=4, return_vectors=True, sparse=True)
+    assert np.allclose(lowest, dense[:4])
+    H = Hamiltonian(num_particles=8, h=0.6, J=1.0).build_sparse()
+    assert np.allclose(H @ vectors, vectors * lowest, atol=1e-8)
+
+    for k in (7, 8):
+        assert np.allclose(find_eigenstates(3, h=0.6, J=1.0, k=k, sparse=True),
+                           find_eigenstates(3, h=0.6, J=1.0)[:k])
+
+
+def test_critical_ground_state_energy():
+    # At h = J = 1 the open chain has E0 = 1 - 1 / sin(pi / (2 (2n + 1))).
+    n = 14
+    energy, state = ground_state(n, h=1.0, J=1.0)
+    assert np.isclose(energy, 1 - 1 / np.sin(np.pi / (2 * (2 * n + 1))))
+    assert np.isclose(np.linalg.norm(state), 1.0)
+
+
+def test_matrix_free_operator_matches_sparse():
+    rng = np.random.default_rng(0)
+    H = Hamiltonian(num_particles=9, h=0.7, J=1.3).build_sparse()
+    op = TransverseFieldOperator(9, h=0.7, J=1.3)
+    v = rng.normal(size=512) + 1j * rng.normal(size=512)
+    V = np.asfortranarray(rng.normal(size=(512, 3)))
+    assert np.allclose(op @ v, H @ v)
+    assert np.allclose(op @ V, H @ V)
+    assert np.allclose(op.H @ v, H @ v)
+
+
+def test_matrix_free_lowest_eigenstates():
+    energies, vectors = lowest_eigenstates(10, h=0.8, J=1.0, k=3)
+    assert np.allclose(energies, find_eigenstates(10, h=0.8, J=1.0)[:3])
+    assert vectors.shape == (2**10, 3)
+
+    ring = Hamiltonian(num_particles=10, h=0.8, J=1.0, periodic=True).build_sparse().toarray()
+    energies, _ = lowest_eigenstates(10, h=0.8, J=1.0, k=3, periodic=True)
+    assert np.allclose(energies, np.linalg.eigvalsh(ring)[:3])
+
+
+@pytest.mark.parametrize("n, periodic", [(6, False), (6, True), (7, True)])
+def test_sector_spectra_make_up_full_spectrum(n, periodic):
+    full = np.linalg.eigvalsh(Hamiltonian(num_particles=n, h=0.7, J=1.1, periodic=periodic).build())
+    spectra = find_sector_eigenstates(n, h=0.7, J=1.1, periodic=periodic)
+    assert len(spectra) == (2 * n if periodic else 2)
+    assert np.allclose(np.sort(np.concatenate(list(spectra.values()))), full)
+
+
+def test_sector_eigenvector_expands_to_eigenvector():
+    qh = Hamiltonian(num_particles=6, h=0.7, J=1.1, periodic=True)
+    H, sector = qh.build_sector(parity=-1, momentum=1)
+    assert np.allclose(H.toarray(), H.toarray().conj().T)
+    energies, vectors = np.linalg.eigh(H.toarray())
+    state = sector.expand(vectors[:, 0])
+    assert np.isclose(np.linalg.norm(state), 1.0)
+    assert np.allclose(qh.build_sparse() @ state, energies[0] * state)
+    with pytest.raises(ValueError):
+        Hamiltonian(num_particles=6, h=0.7, J=1.1).build_sector(momentum=1)
+
+
+def test_operator_terms_are_cached_and_combine_to_h():
+    X, ZZ, _ = operator_terms(7, False, None)
+    assert operator_terms(7, False, None)[0] is X
+    H = Hamiltonian(num_particles=7, h=0.4, J=1.3).build_sparse()
+    assert np.allclose((-0.4 * X - 1.3 * ZZ).toarray(), H.toarray())
+
+
+def test_parameter_sweep_matches_dense_and_warm_start_helps():
+    results = parameter_sweep(8, h=[0.5, 1.0, 1.5], J=1.0)
+    for row in results.itertuples():
+        dense = find_eigenstates(8, h=row.h, J=1.0)
+        assert np.isclose(row.energy * 8, dense[0])
+        assert np.isclose(row.gap, dense[1] - dense[0])
+
+    h = np.linspace(0.2, 2.0, 30)
+    warm = parameter_sweep(12, h, parity=1)
+    cold = parameter_sweep(12, h, parity=1, warm_start=False)
+    assert np.allclose(warm['energy'], cold['energy'])
+    assert warm['matvecs'].sum() < cold['matvecs'].sum()
+    # The fidelity susceptibility peaks near the critical point h = J.
+    assert 0.7 < warm.loc[warm['fidelity_susceptibility'].idxmax(), 'h'] < 1.2
+
+
+def test_full_space_sweep_finds_odd_partner():
+    # In the ordered phase the gap is the tiny splitting of the even/odd
+    # doublet; a warm start from the even ground state alone misses it.
+    h = np.linspace(0.2, 0.6, 5)
+    results = parameter_sweep(8, h)
+    dense = [np.diff(find_eigenstates(8, h=h_i, J=1.0, k=2)[:2])[0] for h_i in h]
+    assert np.allclose(results['gap'], dense, rtol=1e-6, atol=1e-8)
+
+
+def test_krylov_evolution_matches_dense_exponential():
+    from scipy.linalg import expm
+    H = Hamiltonian(num_particles=8, h=0.9, J=1.0).build_sparse()
+    psi0 = product_state(8)
+    for t, psi in evolve(H, psi0, [0.5, 1.3, 4.0]):
+        assert np.allclose(psi, expm(-1j * H.toarray() * t) @ psi0, atol=1e-9)
+
+    with pytest.raises(ValueError):
+        next(evolve(H, psi0, [0.5], tol=0.0))
+    with pytest.raises(ValueError):
+        list(evolve(H, psi0, [1.0, 0.5]))
+    with pytest.raises(ValueError):
+        next(evolve(H, psi0, [-0.5]))
+    with pytest.raises(RuntimeError):
+        next(evolve(H, psi0, [0.5], krylov_dim=2, tol=1e-300))
+
+
+def test_quench_observables():
+    # Without coupling every spin precesses independently: <Z_i> = cos(2 h t).
+    times = np.linspace(0, 3, 7)
+    free = quench(5, h=0.7, J=0.0, times=times, matrix_free=True)
+    assert np.allclose(free['z_2'], np.cos(2 * 0.7 * times))
+    assert np.allclose(free['entropy'], 0.0, atol=1e-8)
+
+    coupled = quench(8, h=1.0, J=1.0, times=times)
+    assert np.allclose(coupled['norm'], 1.0)
+    assert coupled['entropy'].iloc[0] == 0.0 and coupled['entropy'].iloc[-1] > 0.5
+
+
+@pytest.mark.parametrize("h", [0.4, 1.0, 1.8])
+def test_dmrg_matches_exact_diagonalisation(h):
+    n = 8
+    dmrg = DMRG(n, h=h, J=1.0, chi=16, seed=0)
+    energy = dmrg.run()
+    exact, vectors = find_eigenstates(n, h, 1.0, k=1, return_vectors=True)
+    ground = vectors[:, 0]
+    assert np.isclose(energy, exact[0], atol=1e-10)
+    assert np.isclose(abs(np.vdot(dmrg.to_vector(), ground)), 1.0, atol=1e-8)
+    cuts = [entanglement_entropy(ground, n, cut) for cut in range(1, n)]
+    assert np.allclose(dmrg.entropies, cuts, atol=1e-8)
+    transverse = -Hamiltonian(num_particles=n, h=1.0, J=0.0).build_sparse()
+    assert np.isclose(dmrg.local_expectations(X).sum(), ground @ transverse @ ground)
+
+
+def test_dmrg_long_critical_chain():
+    # The open chain at h = J = 1 is exactly solvable:
+    # E0 = 1 - 1 / sin(pi / (2 (2n + 1))).
+    n = 40
+    dmrg = DMRG(n, h=1.0, J=1.0, chi=24, seed=1)
+    energy = dmrg.run()
+    assert np.isclose(energy, 1 - 1 / np.sin(np.pi / (2 * (2 * n + 1))), atol=1e-8)
+    assert dmrg.truncation_error < 1e-10
+    # Critical entanglement grows towards the middle of the chain.
+    assert dmrg.entropies[n // 2] > dmrg.entropies[2] > dmrg.entropies[0]
+
+
+@pytest.mark.filterwarnings("error")
+def test_dmrg_hundreds_of_sites_stay_normalised():
+    n = 300
+    dmrg = DMRG(n, h=1.0, J=1.0, chi=8, seed=0)
+    assert np.isclose(np.linalg.norm(dmrg.tensors[0]), 1.0)
+    energy = dmrg.sweep()
+    assert all(np.all(np.isfinite(A)) for A in dmrg.tensors)
+    assert np.isclose(np.linalg.norm(dmrg.tensors[0]), 1.0)
+    assert np.isclose(energy, 1 - 1 / np.sin(np.pi / (2 * (2 * n + 1))), rtol=1e-4)